@@ -1,3 +1,4 @@
 from .broadcaster import *
 from .docker import *
 from .helpers import *
+from .generator import *
@@ -0,0 +1,75 @@
+import asyncio
+from dataclasses import dataclass
+
+from .common import account_id_from_account
+from .rpc import AsyncNodeRPC
+
+
+# Columnar account state, row i of every column describes accounts[i].
+# Unopened accounts have no frontier and no representative (None).
+@dataclass
+class AccountsSnapshot:
+    accounts: list[str]
+    balances: list[int]
+    pending: list[int]
+    frontiers: list[str]
+    representatives: list[str]
+
+    def __post_init__(self):
+        self.__index = {account: index for index, account in enumerate(self.accounts)}
+
+    def __len__(self):
+        return len(self.accounts)
+
+    def index(self, account) -> int:
+        return self.__index[account_id_from_account(account)]
+
+    def row(self, account) -> dict:
+        index = self.index(account)
+        return {
+            "account": self.accounts[index],
+            "balance": self.balances[index],
+            "pending": self.pending[index],
+            "frontier": self.frontiers[index],
+            "representative": self.representatives[index],
+        }
+
+    def rows(self) -> list[dict]:
+        return [self.row(account) for account in self.accounts]
+
+    @property
+    def total_balance(self) -> int:
+        return sum(self.balances)
+
+    @property
+    def opened(self) -> int:
+        return sum(frontier is not None for frontier in self.frontiers)
+
+
+def _merge(responses: list[dict], key: str) -> dict:
+    # accounts the node does not know end up under "errors" (or are omitted on older nodes)
+    return {account: value for res in responses for account, value in (res.get(key) or {}).items()}
+
+
+# Three bulk RPCs (each chunked and run concurrently) instead of a few RPCs per account
+async def fetch_accounts_snapshot(client: AsyncNodeRPC, accounts: list, chunk_size=1000) -> AccountsSnapshot:
+    accounts = list(dict.fromkeys(account_id_from_account(account) for account in accounts))
+
+    balances, frontiers, representatives = await asyncio.gather(
+        client.call_chunked("accounts_balances", "accounts", accounts, chunk_size),
+        client.call_chunked("accounts_frontiers", "accounts", accounts, chunk_size),
+        client.call_chunked("accounts_representatives", "accounts", accounts, chunk_size),
+    )
+    balances = _merge(balances, "balances")
+    frontiers = _merge(frontiers, "frontiers")
+    representatives = _merge(representatives, "representatives")
+
+    snapshot = AccountsSnapshot(accounts, [], [], [], [])
+    for account in accounts:
+        balance = balances.get(account, {})
+        snapshot.balances.append(int(balance.get("balance", 0)))
+        # newer nodes name it "receivable"
+        snapshot.pending.append(int(balance.get("receivable", balance.get("pending", 0))))
+        snapshot.frontiers.append(frontiers.get(account))
+        snapshot.representatives.append(representatives.get(account))
+    return snapshot
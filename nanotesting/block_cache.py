@@ -0,0 +1,46 @@
+import threading
+from collections import OrderedDict
+
+from . import env
+
+
+# Parsed blocks by hash, bounded LRU. Blocks are immutable by hash so one cache is shared by all nodes of a network.
+class BlockCache:
+    def __init__(self, maxsize=env.BLOCK_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__blocks: OrderedDict[str, "Block"] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__blocks)
+
+    def get(self, block_hash: str) -> "Block":
+        with self.__lock:
+            block = self.__blocks.get(block_hash)
+            if block is None:
+                self.misses += 1
+                return None
+            self.__blocks.move_to_end(block_hash)
+            self.hits += 1
+            return block
+
+    def get_many(self, block_hashes: list[str]) -> dict[str, "Block"]:
+        result = {}
+        for block_hash in block_hashes:
+            block = self.get(block_hash)
+            if block is not None:
+                result[block_hash] = block
+        return result
+
+    def put(self, block_hash: str, block: "Block"):
+        with self.__lock:
+            self.__blocks[block_hash] = block
+            self.__blocks.move_to_end(block_hash)
+            while len(self.__blocks) > self.maxsize:
+                self.__blocks.popitem(last=False)
+
+    def clear(self):
+        with self.__lock:
+            self.__blocks.clear()
@@ -1,24 +1,56 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
 import multiprocessing
 import queue
+import threading
+import time
+from typing import AsyncIterator, Iterator
+
+from . import env
+from .wire import *
+
+# Marks the end of stream of a single producer
+END_OF_STREAM = None
 
 
 class BlockQueue:
     _instance = None
 
-    def __init__(self):
-        self.__queue = multiprocessing.Queue()
+    def __init__(self, batch_size=1024, timeout=env.BLOCK_QUEUE_TIMEOUT, maxsize=0, flush_interval=0.05):
+        # maxsize (in batches) bounds memory when the queue is consumed as a stream
+        self.__queue = multiprocessing.Queue(maxsize)
         self.__all = None
+        self.__batch_size = batch_size
+        self.__batch = bytearray()
+        self.__flush_interval = flush_interval
+        self.__last_flush = time.monotonic()
+        self.__timeout = timeout
+        # The process owning the queue is always a producer
+        self.__producers = multiprocessing.Value("i", 1)
+        self.__finished = False
+        self.__streaming = False
+        self.__stream_done = threading.Event()
+        self.__consumer: Future = None
 
     def close(self):
-        self.__all = self.__wait_all()
+        if not self.__finished:
+            self.finish()
+        if self.__consumer:
+            self.__consumer.result()
+        elif self.__streaming:
+            self.__stream_done.wait()
+        else:
+            self.__all = self.__wait_all()
         self.__queue.close()
 
     @classmethod
     @contextmanager
-    def create(cls):
+    def create(cls, batch_size=1024, timeout=env.BLOCK_QUEUE_TIMEOUT, maxsize=0, flush_interval=0.05):
         prev = cls._instance
-        cls._instance = BlockQueue()
+        cls._instance = BlockQueue(
+            batch_size=batch_size, timeout=timeout, maxsize=maxsize, flush_interval=flush_interval
+        )
         try:
             yield cls._instance
         finally:
@@ -30,28 +62,128 @@ class BlockQueue:
         assert cls._instance is not None, "Missing BlockQueue context"
         return cls._instance
 
+    # Registers an additional producer, must happen before `close()`
+    # (eg. in the parent before spawning a producer process)
+    def register_producer(self):
+        # a forked producer inherits unflushed blocks and would put them again on `finish()`
+        self.flush_batch()
+        with self.__producers.get_lock():
+            self.__producers.value += 1
+
+    # Flushes pending blocks and signals end of stream for the calling producer
+    def finish(self):
+        assert not self.__finished, "Producer already finished"
+        self.flush_batch()
+        self.__queue.put(END_OF_STREAM)
+        self.__finished = True
+
+    @contextmanager
+    def producer(self):
+        try:
+            yield self
+        finally:
+            self.finish()
+
     def put(self, block):
         # print("  put:", block.block_hash)
-        self.__queue.put(block.to_dict())
+        assert not self.__finished, "Producer already finished"
+        self.__batch += pack_block(block)
+        if len(self.__batch) >= self.__batch_size * PACKED_BLOCK_SIZE:
+            self.flush_batch()
+        elif time.monotonic() - self.__last_flush > self.__flush_interval:
+            # keep time to first block low for stream consumers
+            self.flush_batch()
+
+    # Puts already packed blocks (see `wire.pack_block`) as a single message
+    def put_packed(self, packed: bytes):
+        assert len(packed) % PACKED_BLOCK_SIZE == 0
+        self.flush_batch()
+        if packed:
+            self.__queue.put(bytes(packed))
+
+    def flush_batch(self):
+        if self.__batch:
+            self.__queue.put(bytes(self.__batch))
+            self.__batch = bytearray()
+        self.__last_flush = time.monotonic()
+
+    def __batches(self) -> Iterator[bytes]:
+        finished = 0
+        while finished < self.__producers.value:
+            try:
+                batch = self.__queue.get(timeout=self.__timeout)
+            except queue.Empty:
+                raise TimeoutError(f"BlockQueue producers stalled, finished: {finished}/{self.__producers.value}")
+            if batch is END_OF_STREAM:
+                finished += 1
+            else:
+                yield batch
 
-    def __wait_all(self) -> list[dict]:
-        q = []
+    def __wait_all(self) -> PackedBlocks:
         # print("begin blocks awaiting")
-        try:
-            while True:
-                block = self.__queue.get(timeout=1)
-                q.append(block)
-        except queue.Empty:
-            pass
-        print("blocks awaited:", len(q))
-        return q
-
-    def get_all(self) -> list[dict]:
-        if not self.__all:
+        blocks = PackedBlocks(b"".join(self.__batches()))
+        print("blocks awaited:", len(blocks))
+        return blocks
+
+    def get_all(self) -> PackedBlocks:
+        if self.__streaming:
+            raise Exception("BlockQueue consumed as a stream")
+        if self.__all is None:
             raise Exception("BlockQueue not ready")
         else:
             return self.__all
 
+    # Yields batches of blocks as producers put them, until every producer has finished
+    def stream_batches(self) -> Iterator[PackedBlocks]:
+        assert not self.__streaming, "BlockQueue already consumed as a stream"
+        self.__streaming = True
+        try:
+            for batch in self.__batches():
+                yield PackedBlocks(batch)
+        finally:
+            self.__stream_done.set()
+
+    def stream(self) -> Iterator[RawBlock]:
+        for batch in self.stream_batches():
+            yield from batch
+
+    async def astream_batches(self) -> AsyncIterator[PackedBlocks]:
+        loop = asyncio.get_running_loop()
+        batches = self.stream_batches()
+        while True:
+            batch = await loop.run_in_executor(None, next, batches, None)
+            if batch is None:
+                break
+            yield batch
+
+    async def astream(self) -> AsyncIterator[RawBlock]:
+        async for batch in self.astream_batches():
+            for block in batch:
+                yield block
+
+    # Runs `consumer(block_queue)` on a background thread, it must consume the stream and `close()` waits for it
+    def run_consumer(self, consumer) -> Future:
+        assert not self.__consumer, "BlockQueue already has a consumer"
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="blockqueue-consumer")
+        self.__consumer = executor.submit(consumer, self)
+        executor.shutdown(wait=False)
+        return self.__consumer
+
+    # Feeds blocks (or batches) to `sink` on a background thread while they are still being generated
+    def consume(self, sink, batches=False) -> Future:
+        def consume_all(block_queue: BlockQueue):
+            cnt, hashes = 0, []
+            for batch in block_queue.stream_batches():
+                if batches:
+                    hashes.append(sink(batch))
+                else:
+                    hashes.extend(sink(block) for block in batch)
+                cnt += len(batch)
+            print("consumed blockqueue:", cnt)
+            return cnt, hashes
+
+        return self.run_consumer(consume_all)
+
     def flush(self, sink):
         l = self.get_all()
         print("flushing blockqueue:", len(l))
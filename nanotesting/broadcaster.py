@@ -1,6 +1,11 @@
 import asyncio
+import time
+from concurrent.futures import Future
 from typing import Protocol
-from .common import title_bar
+from .common import EventLoopThread, title_bar
+from .load_profile import *
+from .sharding import *
+from .wire import *
 
 from nanoprotocol.blocks import BlockWrapper
 from nanoprotocol import channel
@@ -19,25 +24,76 @@ class NanoBroadcaster(Protocol):
 
 
 class NanoNodeBroadcaster:
-    def __init__(self, node: "NanoNode"):
+    RECONNECT_TRIES = 10
+    RECONNECT_DELAY = 0.5
+
+    def __init__(self, node: "NanoNode", network_type="test", channels=1):
         self.node = node
+        self.network_type = network_type
+        self.channel_count = channels
+        self.channels: list[Channel] = []
+
+    @property
+    def channel(self) -> Channel:
+        return self.channels[0]
 
     async def connect(self):
-        self.channel = await self.__setup_channel()
+        self.channels = list(await asyncio.gather(*[self.__setup_channel() for _ in range(self.channel_count)]))
 
     async def __setup_channel(self):
         print("connect:", self.node.host_realtime_port)
         return await Channel.connect("localhost", self.node.host_realtime_port)
 
-    async def publish(self, block_dict: dict):
+    # Waits until channel transports have handed all queued data to the kernel
+    async def flush(self):
+        while any(channel.writer.transport.get_write_buffer_size() for channel in self.channels):
+            await asyncio.sleep(0.01)
+
+    async def close(self):
+        for channel in self.channels:
+            try:
+                channel.writer.close()
+            except Exception as e:
+                print("close error:", self.node.name, e)
+        self.channels = []
+
+    # Replaces a single broken channel, other channels keep publishing meanwhile
+    async def __reconnect(self, index: int):
+        try:
+            self.channels[index].writer.close()
+        except Exception:
+            pass
+
+        delay = self.RECONNECT_DELAY
+        for attempt in range(self.RECONNECT_TRIES):
+            try:
+                self.channels[index] = await self.__setup_channel()
+                print("reconnected:", self.node.name, "channel:", index)
+                return
+            except (ConnectionError, OSError) as e:
+                print("reconnect error:", self.node.name, "channel:", index, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 10)
+        raise ConnectionError(f"Could not reconnect channel {index} to {self.node.name}")
+
+    # Blocks of one account always use the same channel so their order is preserved
+    def channel_index(self, block) -> int:
+        return account_shard(block_public_key(block), len(self.channels))
+
+    async def publish(self, block, channel: Channel = None):
         try:
+            block_dict = block if isinstance(block, dict) else block.to_dict()
             block_wrapper = blocks.block_from_dict(block_dict)
-            await self.channel.publish_block(block_wrapper)
+            channel = channel or self.channels[self.channel_index(block)]
+            await channel.publish_block(block_wrapper)
         except Exception as e:
             print("publish_block error:", e)
             raise
 
-    async def publish_all(self, blocks: list[dict]):
+    async def publish_all(self, blocks: list[dict], pipelined=False, **kwargs):
+        if pipelined:
+            return await self.publish_pipelined(blocks, **kwargs)
+
         print("publish_all:", len(blocks))
 
         # async with tqdm(total=len(blocks), desc="Publishing Blocks") as pbar:  # Initialize the progress bar
@@ -45,27 +101,119 @@ class NanoNodeBroadcaster:
         #     await self.publish(block)
         #     pbar.update(1)  # Update the progress bar after each block is published
 
+        lanes = [[] for _ in self.channels]
         for block in blocks:
-            await self.publish(block)
+            lanes[self.channel_index(block)].append(block)
+        await asyncio.gather(*[self.__publish_lane(index, lane) for index, lane in enumerate(lanes) if lane])
 
+    # A broken channel is replaced and the failed block published again, the other lanes keep publishing meanwhile
+    async def __publish_lane(self, index: int, blocks: list):
+        for block in blocks:
+            for attempt in range(self.RECONNECT_TRIES):
+                try:
+                    await self.publish(block, self.channels[index])
+                    break
+                except (ConnectionError, OSError) as e:
+                    if attempt == self.RECONNECT_TRIES - 1:
+                        raise
+                    print("channel error:", self.node.name, "channel:", index, e)
+                    await self.__reconnect(index)
+
+    # Coalesces publish messages into large writes, awaiting transport drain only once `window` messages are in flight.
+    # Writes directly to the channel streams, bypassing per block `block_from_dict` and message serialization.
+    async def publish_pipelined(self, blocks, window=4096, write_size=256 * 1024) -> float:
+        messages = encode_publish_all(blocks, self.network_type)
+        start = time.perf_counter()
+
+        await self.write(messages, window=window, write_size=write_size)
+
+        elapsed = time.perf_counter() - start
+        rate = len(messages) / elapsed if elapsed > 0 else 0.0
+        print(
+            f"publish_pipelined: {self.node.name} | channels: {len(self.channels)} | blocks: {len(messages)} | "
+            f"{elapsed:.2f} s | {rate:.0f} blocks/s"
+        )
+        return rate
+
+    async def write(self, messages: PublishMessages, window=4096, write_size=256 * 1024):
+        parts = messages.partition(len(self.channels))
+        await asyncio.gather(
+            *[self.__write_messages(index, part, window, write_size) for index, part in enumerate(parts)]
+        )
 
+    async def __write_messages(self, index: int, messages: PublishMessages, window: int, write_size: int):
+        chunks = list(messages.chunks(write_size))
+        pos = 0
+        while pos < len(chunks):
+            try:
+                writer = self.channels[index].writer
+                end, in_flight = pos, 0
+                while end < len(chunks) and in_flight < window:
+                    writer.write(chunks[end])
+                    in_flight += len(chunks[end]) // PUBLISH_MESSAGE_SIZE
+                    end += 1
+                await writer.drain()
+                pos = end
+            except (ConnectionError, OSError) as e:
+                # resend everything since the last successful drain, nodes ignore duplicate blocks
+                print("channel error:", self.node.name, "channel:", index, e)
+                await self.__reconnect(index)
+
+
+# Long lived broadcaster, channels stay connected on a background event loop between publishing rounds.
+# Async methods must run on that loop, synchronous callers use the blocking methods or `submit`.
 class NanoNetBroadcaster:
-    def __init__(self, nanonet: "NanoNet"):
-        self.broadcasters = [NanoNodeBroadcaster(node) for node in nanonet.nodes]
-        asyncio.run(self.async_connect_all())
+    def __init__(self, nanonet: "NanoNet", channels=1):
+        self.network_type = nanonet.network_type
+        self.channels = channels
+        self.broadcasters = [
+            NanoNodeBroadcaster(node, nanonet.network_type, channels=channels) for node in nanonet.nodes
+        ]
+        self.loop_thread = EventLoopThread()
+        # submitted rounds are published one after another, in submission order
+        self.__round_lock = asyncio.Lock()
+        self.loop_thread.run(self.async_connect_all())
+
+    @property
+    def nodes(self) -> list["NanoNode"]:
+        return [broadcaster.node for broadcaster in self.broadcasters]
 
     async def async_connect_all(self):
         tasks = [broadcaster.connect() for broadcaster in self.broadcasters]
         await asyncio.gather(*tasks)
 
-    async def async_publish_all(self, blocks: list[dict]):
+    async def async_close(self):
+        await asyncio.gather(*[broadcaster.close() for broadcaster in self.broadcasters])
+
+    def close(self):
+        try:
+            self.loop_thread.run(self.async_close())
+        finally:
+            self.loop_thread.stop()
+
+    async def __serialized(self, coro):
+        async with self.__round_lock:
+            return await coro
+
+    # Schedules a coroutine function of this broadcaster on its loop without blocking the caller
+    def submit(self, func, *args, **kwargs) -> Future:
+        return self.loop_thread.submit(self.__serialized(func(*args, **kwargs)))
+
+    async def async_publish_all(self, blocks: list[dict], pipelined=False, **kwargs):
         print("net broadcasting:", len(blocks))
 
+        if pipelined:
+            # encode once, every channel writes the same immutable buffer
+            blocks = encode_publish_all(blocks, self.network_type)
+
         # async with tqdm(total=len(blocks) * len(self.broadcasters), desc="Net Broadcasting") as pbar:
         #     tasks = [self.__publish_blocks_with_progress(broadcaster, blocks, pbar) for broadcaster in self.broadcasters]
         #     await asyncio.gather(*tasks)
 
-        tasks = [self.__publish_blocks(broadcaster, blocks) for broadcaster in self.broadcasters]
+        tasks = [
+            self.__publish_blocks(broadcaster, blocks, pipelined=pipelined, **kwargs)
+            for broadcaster in self.broadcasters
+        ]
         await asyncio.gather(*tasks)
 
         print("done net broadcasting")
@@ -73,8 +221,84 @@ class NanoNetBroadcaster:
     async def __publish_blocks_with_progress(self, broadcaster, blocks, pbar):
         await broadcaster.publish_all(blocks)
 
-    async def __publish_blocks(self, broadcaster, blocks):
-        await broadcaster.publish_all(blocks)
+    async def __publish_blocks(self, broadcaster, blocks, **kwargs):
+        await broadcaster.publish_all(blocks, **kwargs)
+
+    def publish_all(self, blocks: list[dict], **kwargs):
+        return self.submit(self.async_publish_all, blocks, **kwargs).result()
+
+    # Injects every chain at one node (or `replicas` nodes) picked by the sharding policy,
+    # instead of all blocks to all nodes
+    async def async_publish_sharded(
+        self, blocks, policy: ShardingPolicy = None, replicas=1, window=4096, write_size=256 * 1024
+    ) -> float:
+        messages = encode_publish_all(blocks, self.network_type)
+        parts = shard_messages(messages, len(self.broadcasters), policy, replicas)
+        print("net sharded broadcasting:", len(messages), "per node:", [len(part) for part in parts])
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[
+                broadcaster.write(part, window=window, write_size=write_size)
+                for broadcaster, part in zip(self.broadcasters, parts)
+            ]
+        )
+        elapsed = time.perf_counter() - start
+
+        rate = len(messages) / elapsed if elapsed > 0 else 0.0
+        print(f"done net sharded broadcasting | {elapsed:.2f} s | injected: {rate:.0f} blocks/s")
+        return rate
+
+    def publish_sharded(self, blocks, **kwargs) -> float:
+        return self.submit(self.async_publish_sharded, blocks, **kwargs).result()
+
+    # Publishes batches as they arrive from the queue instead of waiting for generation to finish
+    async def async_publish_stream(self, block_queue: "BlockQueue", pipelined=False, **kwargs):
+        cnt = 0
+        async for batch in block_queue.astream_batches():
+            if pipelined:
+                batch = encode_publish_all(batch, self.network_type)
+            tasks = [
+                self.__publish_blocks(broadcaster, batch, pipelined=pipelined, **kwargs)
+                for broadcaster in self.broadcasters
+            ]
+            await asyncio.gather(*tasks)
+            cnt += len(batch)
+        print("done net stream broadcasting:", cnt)
+        return cnt
+
+    def publish_stream(self, block_queue: "BlockQueue", **kwargs):
+        return self.submit(self.async_publish_stream, block_queue, **kwargs).result()
+
+    # Publishes at the rate given by the load profile (token bucket paced),
+    # reporting offered vs achieved rate per interval
+    async def async_publish_paced(
+        self, blocks, profile: LoadProfile, chunk_size=64, interval=1.0, window=4096
+    ) -> RateReport:
+        messages = encode_publish_all(blocks, self.network_type)
+        print("net paced broadcasting:", len(messages), "profile:", profile)
+
+        report = RateReport(interval)
+        bucket = TokenBucket(profile, burst=chunk_size * 4)
+        offered = 0.0
+        sent = 0
+        for chunk in messages.chunks(chunk_size * PUBLISH_MESSAGE_SIZE):
+            if profile.duration is not None and bucket.elapsed >= profile.duration:
+                break
+
+            count = len(chunk) // PUBLISH_MESSAGE_SIZE
+            await bucket.acquire(count)
+
+            part = PublishMessages(bytes(chunk))
+            await asyncio.gather(*[broadcaster.write(part, window=window) for broadcaster in self.broadcasters])
+
+            report.record(bucket.elapsed, bucket.offered - offered, count)
+            offered = bucket.offered
+            sent += count
+
+        print("done net paced broadcasting:", sent)
+        report.print()
+        return report
 
-    def publish_all(self, blocks: list[dict]):
-        asyncio.run(self.async_publish_all(blocks))
+    def publish_paced(self, blocks, profile: LoadProfile, **kwargs) -> RateReport:
+        return self.submit(self.async_publish_paced, blocks, profile, **kwargs).result()
@@ -0,0 +1,154 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+from .broadcaster import NanoNodeBroadcaster
+from .wire import *
+
+
+# Picklable stand-in for NanoNode, all a node broadcaster needs in a worker process
+class NodeEndpoint(NamedTuple):
+    name: str
+    host_realtime_port: int
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # Workers share the parent's resource tracker (under fork, spawn and forkserver alike), attaching registers the
+    # segment a second time which the tracker ignores, and the parent's unlink unregisters it once
+    return shared_memory.SharedMemory(name=name)
+
+
+async def _worker(endpoints, network_type, channels, commands, results):
+    broadcasters = [NanoNodeBroadcaster(endpoint, network_type, channels=channels) for endpoint in endpoints]
+    try:
+        await asyncio.gather(*[broadcaster.connect() for broadcaster in broadcasters])
+    except Exception as e:
+        results.put(("error", repr(e)))
+        return
+    results.put(("ready", None))
+
+    loop = asyncio.get_running_loop()
+    while True:
+        command = await loop.run_in_executor(None, commands.get)
+        if command is None:
+            break
+
+        shm_name, size, kwargs = command
+        shm = _attach(shm_name)
+        try:
+            messages = PublishMessages(shm.buf[:size])
+            rates = await asyncio.gather(
+                *[broadcaster.publish_pipelined(messages, **kwargs) for broadcaster in broadcasters]
+            )
+            # transports may still reference the shared buffer until flushed
+            await asyncio.gather(*[broadcaster.flush() for broadcaster in broadcasters])
+            results.put(("done", {broadcaster.node.name: rate for broadcaster, rate in zip(broadcasters, rates)}))
+        except Exception as e:
+            results.put(("error", repr(e)))
+        finally:
+            messages = None
+            shm.close()
+
+    await asyncio.gather(*[broadcaster.close() for broadcaster in broadcasters])
+
+
+def _worker_main(endpoints, network_type, channels, commands, results):
+    asyncio.run(_worker(endpoints, network_type, channels, commands, results))
+
+
+# Spreads node channels across worker processes, each with its own event loop.
+# Publish messages are encoded once in the parent and handed to the workers through shared memory.
+class NanoNetBroadcasterPool:
+    READY_TIMEOUT = 60
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, nanonet: "NanoNet", processes=None, channels=1):
+        self.network_type = nanonet.network_type
+        self.nodes = list(nanonet.nodes)
+        self.channels = channels
+
+        endpoints = [NodeEndpoint(node.name, node.host_realtime_port) for node in self.nodes]
+        self.processes = min(processes or os.cpu_count(), len(endpoints))
+        print("broadcaster pool:", len(endpoints), "nodes", "processes:", self.processes)
+
+        self.__results = multiprocessing.Queue()
+        self.__commands = []
+        self.__workers = []
+        for index in range(self.processes):
+            commands = multiprocessing.Queue()
+            worker = multiprocessing.Process(
+                target=_worker_main,
+                args=(endpoints[index :: self.processes], self.network_type, channels, commands, self.__results),
+                name=f"broadcaster-{index}",
+                daemon=True,
+            )
+            worker.start()
+            self.__commands.append(commands)
+            self.__workers.append(worker)
+
+        try:
+            self.__collect("ready", timeout=self.READY_TIMEOUT)
+        except Exception:
+            self.close()
+            raise
+
+    # One reply per worker, fails instead of blocking forever when a worker died without replying
+    def __collect(self, expected: str, timeout: float = None) -> list:
+        replies = []
+        start = time.monotonic()
+        while len(replies) < len(self.__workers):
+            try:
+                replies.append(self.__results.get(timeout=self.POLL_INTERVAL))
+                continue
+            except queue.Empty:
+                pass
+            alive = sum(worker.is_alive() for worker in self.__workers)
+            if len(replies) + alive < len(self.__workers):
+                dead = [worker.name for worker in self.__workers if not worker.is_alive()]
+                raise Exception(f"broadcaster pool workers died: {dead}")
+            if timeout is not None and time.monotonic() - start > timeout:
+                raise TimeoutError(f"broadcaster pool: {len(replies)}/{len(self.__workers)} replies after {timeout} s")
+        errors = [payload for status, payload in replies if status == "error"]
+        if errors:
+            raise Exception(f"broadcaster pool errors: {errors}")
+        assert all(status == expected for status, payload in replies)
+        return [payload for status, payload in replies]
+
+    def publish_all(self, blocks, window=4096, write_size=256 * 1024) -> float:
+        messages = encode_publish_all(blocks, self.network_type)
+        size = len(messages.buffer)
+        if size == 0:
+            return 0.0
+        print("pool broadcasting:", len(messages))
+
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            shm.buf[:size] = messages.buffer
+            start = time.perf_counter()
+            for commands in self.__commands:
+                commands.put((shm.name, size, {"window": window, "write_size": write_size}))
+            node_rates = {}
+            for rates in self.__collect("done"):
+                node_rates.update(rates)
+            elapsed = time.perf_counter() - start
+        finally:
+            shm.close()
+            shm.unlink()
+
+        rate = len(messages) * len(node_rates) / elapsed if elapsed > 0 else 0.0
+        print(f"done pool broadcasting | nodes: {len(node_rates)} | {elapsed:.2f} s | aggregate: {rate:.0f} blocks/s")
+        return rate
+
+    def close(self):
+        for commands in self.__commands:
+            commands.put(None)
+        for worker in self.__workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+        self.__workers = []
+        self.__commands = []
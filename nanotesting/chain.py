@@ -1,9 +1,13 @@
+import json
 import multiprocessing
 import queue
+from binascii import hexlify, unhexlify
 from typing import Protocol, Union
 import nanolib
 
 from .block_queue import BlockQueue
+from .store import *
+from .work import WorkEngine
 
 from . import env
 
@@ -11,6 +15,86 @@ from .common import *
 
 
 class Block:
+    # Lightweight view over a record in the BlockStore
+    __slots__ = ("store", "slot")
+
+    def __init__(self, store: BlockStore, slot: int):
+        self.store = store
+        self.slot = slot
+
+    @classmethod
+    def from_nlib(cls, block_nlib: nanolib.Block, prev_block: "Block" = None) -> "Block":
+        if block_nlib.block_type != "state":
+            return NlibBlock(block_nlib, prev_block)
+
+        data, block_hash = encode_nlib_block(block_nlib)
+        store = BlockStore.default()
+        prev_slot = prev_block.slot if isinstance(prev_block, Block) and prev_block.store is store else -1
+        return cls(store, store.append(data, block_hash, prev_slot))
+
+    @property
+    def prev_block(self) -> "Block":
+        prev_slot = self.store.prev_slot(self.slot)
+        if prev_slot < 0:
+            return None
+        return Block(self.store, prev_slot)
+
+    @property
+    def data(self) -> bytes:
+        return self.store.data(self.slot)
+
+    @property
+    def hash_bytes(self) -> bytes:
+        return self.store.block_hash(self.slot)
+
+    @property
+    def public_key(self) -> bytes:
+        return self.store.field(self.slot, ACCOUNT)
+
+    @property
+    def balance(self):
+        return self.store.balance(self.slot)
+
+    @property
+    def account(self):
+        return to_account_id(self.public_key)
+
+    @property
+    def representative(self):
+        return to_account_id(self.store.field(self.slot, REPRESENTATIVE))
+
+    @property
+    def previous(self):
+        return hexlify(self.store.field(self.slot, PREVIOUS)).decode().upper()
+
+    @property
+    def block_hash(self):
+        return hexlify(self.hash_bytes).decode().upper()
+
+    @property
+    def send_amount(self):
+        prev_slot = self.store.prev_slot(self.slot)
+        if prev_slot < 0:
+            raise ValueError("Previous block not available")
+        diff = self.store.balance(prev_slot) - self.balance
+        if diff <= 0:
+            raise ValueError("Not a send block")
+        return diff
+
+    @property
+    def block_nlib(self) -> nanolib.Block:
+        return nanolib.Block.from_dict(self.to_dict(), verify=False)
+
+    def json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def to_dict(self) -> dict:
+        return decode_state_block(self.data)
+
+
+# Blocks fetched from nodes, kept out of the BlockStore (which never evicts) so only the LRU BlockCache holds them.
+# Legacy (non-state) blocks do not fit the store record format either.
+class NlibBlock:
     def __init__(self, block_nlib: nanolib.Block, prev_block: "Block"):
         self.block_nlib = block_nlib
         self.prev_block = prev_block
@@ -27,6 +111,10 @@ class Block:
     def representative(self):
         return self.block_nlib.representative
 
+    @property
+    def previous(self):
+        return self.block_nlib.previous
+
     @property
     def block_hash(self):
         return self.block_nlib.block_hash
@@ -53,12 +141,15 @@ class AccountId(Protocol):
 
 
 class Chain:
-    DEFAULT_WORK = "0000000000000000"
+    DEFAULT_WORK = "0000000000000000"  # used when the network difficulty is zero
 
     def __init__(self, account_id, private_key, frontier=None):
         self.account_id = account_id
         self.private_key = private_key
         self.frontier = frontier
+        self.public_key = to_public_key(account_id)
+        # (frontier, Block) copy of a frontier living outside the current store
+        self.__frontier_copy = None
 
     @property
     def balance(self):
@@ -69,6 +160,30 @@ class Chain:
         account: Union["NanoWalletAccount", "Chain", str],
         amount,
         fork=False,
+    ) -> Block:
+        block = self.create_send(account, amount)
+        BlockQueue.default().put(block)
+        if not fork:
+            self.__advance(block)
+        return block
+
+    def receive(
+        self,
+        block: Block,
+        representative=None,
+        fork=False,
+    ) -> Block:
+        block = self.create_receive(block, representative=representative)
+        BlockQueue.default().put(block)
+        if not fork:
+            self.__advance(block)
+        return block
+
+    # Builds and signs the block without queueing it or advancing the frontier
+    def create_send(
+        self,
+        account: Union["NanoWalletAccount", "Chain", str],
+        amount,
     ) -> Block:
         if amount <= 0:
             raise ValueError("Amount must be positive")
@@ -77,73 +192,86 @@ class Chain:
 
         destination_id = account_id_from_account(account)
 
-        block_nlib = nanolib.Block(
-            block_type="state",
-            account=self.account_id,
+        return self.__create_block(
             representative=self.frontier.representative,
-            previous=self.frontier.block_hash,
-            link_as_account=destination_id,
+            link=to_public_key(destination_id),
             balance=self.frontier.balance - amount,
         )
-        block_nlib.sign(self.private_key)
-        # block_nlib.solve_work(env.DIFFICULTY)
-        block_nlib.set_work(self.DEFAULT_WORK)
 
-        block = Block(block_nlib, self.frontier)
-        BlockQueue.default().put(block)
-        if not fork:
-            self.frontier = block
-        return block
-
-    def receive(
+    def create_receive(
         self,
         block: Block,
         representative=None,
-        fork=False,
     ) -> Block:
         if not self.frontier:
             # open account
-
-            if not representative:
-                representative_id = env.DEFAULT_REPR
-            else:
-                representative_id = representative.account_id
-
-            block_nlib = nanolib.Block(
-                block_type="state",
-                account=self.account_id,
-                representative=representative_id,
-                previous=None,
-                link=block.block_hash,
-                balance=block.send_amount,
+            representative_id = account_id_from_account(representative) if representative else env.DEFAULT_REPR
+            balance = block.send_amount
+        else:
+            representative_id = (
+                account_id_from_account(representative) if representative else self.frontier.representative
             )
-            block_nlib.sign(self.private_key)
-            # block_nlib.solve_work(env.DIFFICULTY)
-            block_nlib.set_work(self.DEFAULT_WORK)
+            balance = int(self.frontier.balance + block.send_amount)
+
+        return self.__create_block(
+            representative=representative_id,
+            link=unhexlify(block.block_hash),
+            balance=balance,
+        )
 
-            block = Block(block_nlib, None)
+    # A fetched state frontier is added to the store once a chain builds on it, so send amounts of new blocks resolve.
+    # The copy is reused while the frontier stays, eg. for forks built on it.
+    def __frontier_slot(self, store: BlockStore) -> int:
+        if isinstance(self.frontier, Block) and self.frontier.store is store:
+            return self.frontier.slot
+        if self.__frontier_copy:
+            frontier, copy = self.__frontier_copy
+            if frontier is self.frontier and copy.store is store:
+                return copy.slot
 
+        if isinstance(self.frontier, Block):
+            # frontier from an earlier (scoped) store
+            data, block_hash = self.frontier.data, self.frontier.hash_bytes
+        elif isinstance(self.frontier, NlibBlock) and self.frontier.block_nlib.block_type == "state":
+            data, block_hash = encode_nlib_block(self.frontier.block_nlib)
         else:
-            if not representative:
-                representative_id = self.frontier.representative
-            else:
-                representative = representative.account_id
-
-            block_nlib = nanolib.Block(
-                block_type="state",
-                account=self.account_id,
-                representative=representative_id,
-                previous=self.frontier.block_hash,
-                link=block.block_hash,
-                balance=int(self.frontier.balance + block.send_amount),
-            )
-            block_nlib.sign(self.private_key)
-            # block_nlib.solve_work(env.DIFFICULTY)
-            block_nlib.set_work(self.DEFAULT_WORK)
+            return -1
+        copy = Block(store, store.append(data, block_hash))
+        self.__frontier_copy = (self.frontier, copy)
+        return copy.slot
 
-            block = Block(block_nlib, self.frontier)
+    def __create_block(self, representative: str, link: bytes, balance: int) -> Block:
+        store = BlockStore.default()
 
-        BlockQueue.default().put(block)
-        if not fork:
-            self.frontier = block
+        if self.frontier:
+            previous = unhexlify(self.frontier.block_hash)
+            prev_slot = self.__frontier_slot(store)
+        else:
+            previous = ZERO_HASH
+            prev_slot = -1
+
+        work_engine = WorkEngine.default()
+        if work_engine.enabled:
+            # open blocks use the account public key as work root
+            root = previous if previous != ZERO_HASH else self.public_key
+            work = work_engine.solve(hexlify(root).decode().upper())
+        else:
+            work = self.DEFAULT_WORK
+
+        data, block_hash = encode_state_block(
+            account=self.public_key,
+            previous=previous,
+            representative=to_public_key(representative),
+            balance=balance,
+            link=link,
+            private_key=self.private_key,
+            work=unhexlify(work),
+        )
+        block = Block(store, store.append(data, block_hash, prev_slot))
         return block
+
+    # Only an advanced frontier is extended, forks and unqueued blocks would waste background solves
+    def __advance(self, block: Block):
+        self.frontier = block
+        # the next block of this chain will need work for this hash, start solving it right away
+        WorkEngine.default().prefetch([block.block_hash])
@@ -1,5 +1,10 @@
+import asyncio
 import io
+import os
 import tarfile
+import threading
+from concurrent.futures import Future
+from typing import Iterator
 
 import nanolib
 from decorator import decorator
@@ -18,7 +23,14 @@ def env_data_to_list(env: dict) -> list:
 
 
 def hash_from_block(block):
+    if hasattr(block, "block_hash"):
+        # precomputed for stored and packed blocks
+        return block.block_hash
+    if isinstance(block, str):
+        return block.upper()
     if isinstance(block, dict):
+        if "hash" in block:
+            return block["hash"].upper()
         block_nlib = nanolib.Block.from_dict(block, verify=False)
         return block_nlib.block_hash
     raise ValueError("unknown block type")
@@ -74,3 +86,88 @@ def remove_files_from_tar(tar_bytes, ignored_files):
     original_tar.close()
 
     return result
+
+
+DATA_CHUNK_SIZE = 2 * 1024 * 1024
+
+
+# Read only file object over an iterator of byte chunks, eg. a docker archive stream
+class ChunkReader(io.RawIOBase):
+    def __init__(self, chunks):
+        self.__chunks = iter(chunks)
+        self.__pending = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.__pending:
+            chunk = next(self.__chunks, None)
+            if chunk is None:
+                return 0
+            self.__pending = memoryview(chunk)
+        size = min(len(buffer), len(self.__pending))
+        buffer[:size] = self.__pending[:size]
+        self.__pending = self.__pending[size:]
+        return size
+
+
+# Writes chunks to a path or a binary file object (eg. a pipe) as they arrive, returns the number of bytes written
+def write_all(chunks, target) -> int:
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "wb") as f:
+            return write_all(chunks, f)
+    written = 0
+    for chunk in chunks:
+        target.write(chunk)
+        written += len(chunk)
+    return written
+
+
+# Chunks of bytes, a path, a binary file object or an iterator of chunks
+def read_chunks(source, chunk_size=DATA_CHUNK_SIZE) -> Iterator[bytes]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield source
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from read_chunks(f, chunk_size)
+    elif hasattr(source, "read"):
+        while chunk := source.read(chunk_size):
+            yield chunk
+    else:
+        yield from source
+
+
+# Streaming `remove_files_from_tar`, members are copied one at a time from `chunks` to `target` (path or file object)
+def filter_tar_stream(chunks, target, ignored_files):
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "wb") as f:
+            return filter_tar_stream(chunks, f, ignored_files)
+
+    with tarfile.open(fileobj=ChunkReader(chunks), mode="r|") as original_tar:
+        with tarfile.open(fileobj=target, mode="w|") as new_tar:
+            for member in original_tar:
+                if member.name in ignored_files:
+                    print("skipping:", member.name)
+                    continue
+                new_tar.addfile(member, original_tar.extractfile(member) if member.isfile() else None)
+
+
+# Event loop running forever on a daemon thread, coroutines are submitted from synchronous code
+class EventLoopThread:
+    def __init__(self, name="broadcaster-loop"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, coro) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro):
+        return self.submit(coro).result()
+
+    def stop(self):
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+        self.loop.close()
@@ -7,9 +7,13 @@ import multiprocessing
 import os
 import queue
 import random
+import re
 import signal
 import sys
+import threading
+import time
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from decimal import *
@@ -24,9 +28,18 @@ import nanolib
 from retry import retry
 
 from . import env
-from .chain import Block, BlockQueue, Chain
+from .accounts import *
+from .block_cache import BlockCache
+from .chain import Block, BlockQueue, Chain, NlibBlock
 from .common import *
 from .broadcaster import *
+from .broadcaster_pool import *
+from .rpc import *
+from .metrics import MetricsCollector
+from .report import RunRecorder, RunReport
+from .status import *
+from .websocket import ConfirmationTracker
+from .work import WorkEngine
 
 docker_client = docker.from_env()
 
@@ -39,7 +52,8 @@ class NanoWalletAccount:
         self.private_key = private_key
 
     def __str__(self):
-        return f"[{self.account_id} | balance: {self.balance} | pending: {self.pending}]"
+        res = self.node.rpc.account_balance(self.account_id)
+        return f"[{self.account_id} | balance: {Decimal(res['balance'])} | pending: {Decimal(res['pending'])}]"
 
     @property
     def balance(self):
@@ -93,6 +107,10 @@ BlockCount = namedtuple("BlockCount", ["checked", "unchecked", "cemented"])
 AecInfo = namedtuple("AecInfo", ["confirmed", "unconfirmed", "confirmations"])
 
 
+def has_previous(block) -> bool:
+    return bool(block.previous) and int(block.previous, 16) != 0
+
+
 def block_to_json(block):
     if isinstance(block, str):
         return block
@@ -104,6 +122,7 @@ def block_to_json(block):
 class NanoNodeRPC:
     def __init__(self, rpc_address):
         self.rpc = nano.rpc.Client(rpc_address)
+        self.pool = NodeRPCPool(rpc_address)
 
     @retry(tries=3, delay=0.5)
     def process_block(self, block: Union[Block, str], async_process=True):
@@ -115,9 +134,12 @@ class NanoNodeRPC:
         else:
             return self.rpc.process(json)
 
-    def process_blocks(self, blocks: list[Union[Block, str]], async_process=True):
-        for block in blocks:
-            self.process_block(block, async_process=async_process)
+    # Concurrent submission over pooled connections, returns hashes (or exceptions) in input order
+    def process_blocks(self, blocks: list[Union[Block, str]], async_process=True, **kwargs):
+        return self.pool.process_blocks(blocks, async_process=async_process, **kwargs)
+
+    def close(self):
+        self.pool.close()
 
     # TODO: REMOVE, USES CUSTOM EXPERIMENTAL RPC
     @retry(tries=3, delay=0.5)
@@ -129,9 +151,10 @@ class NanoNodeRPC:
 
 
 class NanoNode:
-    def __init__(self, container, node_env):
+    def __init__(self, container, node_env, block_cache: BlockCache = None):
         self.container = container
         self.node_env = node_env
+        self.block_cache = block_cache or BlockCache()
 
     @property
     def rpc_address(self):
@@ -166,6 +189,9 @@ class NanoNode:
 
         if self.container.status != "exited":
             self.rpc.stop()
+        # attached nodes were never started and have no RPC pool
+        if getattr(self, "rpc_node", None):
+            self.rpc_node.close()
 
         self.ensure_stopped()
 
@@ -189,6 +215,15 @@ class NanoNode:
     def host_realtime_port(self):
         return int(self.container.ports[f"{env.REALTIME_PORT}/tcp"][0]["HostPort"])
 
+    @property
+    def host_websocket_port(self):
+        ports = self.container.ports.get(f"{env.WEBSOCKET_PORT}/tcp")
+        return int(ports[0]["HostPort"]) if ports else None
+
+    @property
+    def websocket_address(self):
+        return f"ws://localhost:{self.host_websocket_port}"
+
     @property
     def full_name(self) -> str:
         return self.container.name
@@ -226,20 +261,28 @@ class NanoNode:
     def process_block(self, block: Block, async_process=True):
         return self.rpc_node.process_block(block, async_process=async_process)
 
-    def process_blocks(self, blocks: list[Block], async_process=True):
-        for block in blocks:
-            self.process_block(block, async_process=async_process)
+    def process_blocks(self, blocks: list[Block], async_process=True, **kwargs):
+        return self.rpc_node.process_blocks(blocks, async_process=async_process, **kwargs)
 
     def block(self, hash: str, load_previous=False) -> Block:
+        hash = hash.upper()
+        block = self.block_cache.get(hash)
+        # a cached block may have been loaded without its previous block
+        if block is None or (load_previous and block.prev_block is None and has_previous(block)):
+            block = self.__fetch_block(hash, load_previous)
+        return block
+
+    def __fetch_block(self, hash: str, load_previous: bool) -> Block:
         block_nlib = self.__nlib_block(hash)
 
-        if load_previous and block_nlib.previous:
+        if load_previous and has_previous(block_nlib):
             # TODO: properly extracting previous block based on type
             prev_block = self.block(block_nlib.previous, load_previous=False)
-            block = Block(block_nlib, prev_block)
+            block = NlibBlock(block_nlib, prev_block)
         else:
-            block = Block(block_nlib, None)
+            block = NlibBlock(block_nlib, None)
 
+        self.block_cache.put(hash, block)
         return block
 
     def __nlib_block(self, hash):
@@ -247,6 +290,36 @@ class NanoNode:
         block_nlib = nanolib.Block.from_dict(block_dict, verify=False)
         return block_nlib
 
+    def accounts_snapshot(self, accounts: list, chunk_size=1000) -> AccountsSnapshot:
+        return rpc_loop().run(fetch_accounts_snapshot(self.rpc_node.pool.client, accounts, chunk_size=chunk_size))
+
+    # Bulk `NanoWalletAccount.to_chain`, frontiers from one snapshot and frontier blocks from `blocks_info`
+    def chains(self, accounts: list[NanoWalletAccount]) -> list[Chain]:
+        snapshot = self.accounts_snapshot(accounts)
+        frontiers = [snapshot.frontiers[snapshot.index(account)] for account in accounts]
+        opened = [frontier for frontier in frontiers if frontier]
+        blocks = dict(zip(opened, self.blocks(opened)))
+        return [
+            Chain(account.account_id, account.private_key, blocks.get(frontier))
+            for account, frontier in zip(accounts, frontiers)
+        ]
+
+    def blocks_info(self, hashes: list[str], chunk_size=1000) -> dict[str, dict]:
+        return self.rpc_node.pool.blocks_info(hashes, chunk_size=chunk_size)
+
+    # Bulk lookup, blocks missing from the cache are fetched with chunked `blocks_info` calls.
+    # With `cached=False` every block is fetched, ie. the node must have all of them.
+    def blocks(self, hashes: list[str], cached=True) -> list[Block]:
+        hashes = [hash.upper() for hash in hashes]
+        found = self.block_cache.get_many(hashes) if cached else {}
+        missing = [hash for hash in dict.fromkeys(hashes) if hash not in found]
+        if missing:
+            for hash, info in self.blocks_info(missing).items():
+                block = NlibBlock(nanolib.Block.from_dict(info["contents"], verify=False), None)
+                self.block_cache.put(hash, block)
+                found[hash] = block
+        return [found[hash] for hash in hashes]
+
     def populate_backlog(self):
         res = self.rpc.call("populate_backlog")
         return True
@@ -270,20 +343,12 @@ class NanoNode:
         confirmations = res["confirmations"]
         return AecInfo(confirmed, unconfirmed, confirmations)
 
-    # TODO: Use pull_data
     def pull_ledger(self):
-        self.container.reload()
-        assert self.container.status == "exited"
+        return self.pull_data(f"{env.NANO_DATA_PATH}/data.ldb")
 
-        bits, stat = self.container.get_archive(f"{env.NANO_DATA_PATH}/data.ldb")
-        return read_all(bits)
-
-    # TODO: Use push_data
+    # `ledger` is the archive as bytes, a path, a binary file object or an iterator of chunks
     def push_ledger(self, ledger):
-        self.container.reload()
-        assert self.container.status in {"exited", "created"}
-
-        self.container.put_archive(f"{env.NANO_DATA_PATH}/", ledger)
+        self.push_data(ledger, f"{env.NANO_DATA_PATH}/data.ldb")
 
     def pull_data(self, path=f"{env.NANO_DATA_PATH}"):
         self.container.reload()
@@ -292,10 +357,28 @@ class NanoNode:
         bits, stat = self.container.get_archive(path)
         return read_all(bits)
 
+    # Streams the archive of `path` to `target` (path or binary file object), memory use does not depend on its size
+    def pull_data_to(self, target, path=f"{env.NANO_DATA_PATH}", ignored_files: list[str] = None):
+        self.container.reload()
+        assert self.container.status == "exited"
+
+        bits, stat = self.container.get_archive(path, chunk_size=DATA_CHUNK_SIZE)
+        if ignored_files:
+            filter_tar_stream(bits, target, ignored_files)
+        else:
+            written = write_all(bits, target)
+            print("pulled:", self.name, path, "bytes:", written)
+
+    def pull_ledger_to(self, target):
+        self.pull_data_to(target, f"{env.NANO_DATA_PATH}/data.ldb")
+
+    # `data` is the archive as bytes, a path, a binary file object or an iterator of chunks, streamed in chunks
     def push_data(self, data, path=f"{env.NANO_DATA_PATH}"):
         self.container.reload()
         assert self.container.status in {"exited", "created"}
 
+        if not isinstance(data, bytes):
+            data = read_chunks(data)
         self.container.put_archive(os.path.dirname(path), data)
 
     def print_confirmations(self):
@@ -322,8 +405,10 @@ class NanoNode:
         ensure_synchronized()
 
         if blocks:
-            for block in blocks:
-                self.block(hash_from_block(block))
+            report = StatusPoller([self]).verify([hash_from_block(block) for block in blocks])
+            if not report.confirmed:
+                report.print()
+                raise ValueError("not all blocks confirmed")
 
 
 def extract_nodes(nodes: Union[NanoNet, NanoNode, list[NanoNode]]):
@@ -341,29 +426,28 @@ def print_nodes(nodes: Union[NanoNet, NanoNode, list[NanoNode]]):
         print(node)
 
 
+# Waits until a single concurrent snapshot of all nodes shows every block cemented everywhere
 @title_bar(name="ENSURE ALL CONFIRMED")
-def ensure_all_confirmed(nodes: Union[NanoNet, NanoNode, list[NanoNode]], blocks=None, populate_backlog=False):
+def ensure_all_confirmed(
+    nodes: Union[NanoNet, NanoNode, list[NanoNode]], blocks=None, populate_backlog=False, timeout: float = None
+) -> NetStatus:
     nodes = extract_nodes(nodes)
 
-    @retry(delay=0.5)
-    def ensure_all_confirmed_loop():
-        print_nodes(nodes)
-
-        if populate_backlog:
-            for node in nodes:
-                node.try_populate_backlog()
+    poller = StatusPoller(nodes)
+    begin = time.monotonic()
+    status = poller.wait(timeout=timeout, populate_backlog=populate_backlog)
 
-        cemented_min = min([node.block_count.cemented for node in nodes])
-        cemented_max = max([node.block_count.cemented for node in nodes])
-        if cemented_min != cemented_max:
-            raise ValueError("cemented min != max")
+    if blocks:
+        start = time.monotonic()
+        # `timeout` bounds the whole call, block verification only gets what convergence left of it
+        remaining = None if timeout is None else max(0.0, timeout - (start - begin))
+        hashes = [hash_from_block(block) for block in blocks]
+        poller.wait_confirmed(hashes, timeout=remaining, populate_backlog=populate_backlog)
+        status = poller.snapshot_sync()
+        print(f"all blocks confirmed: {len(blocks)} | {time.monotonic() - start:.2f} s")
 
-        for node in nodes:
-            node.ensure_all_confirmed(blocks)
-
-    ensure_all_confirmed_loop()
-
-    print_nodes(nodes)
+    status.print()
+    return status
 
 
 class NodeWalletAccountTuple(NamedTuple):
@@ -372,6 +456,10 @@ class NodeWalletAccountTuple(NamedTuple):
     account: NanoWalletAccount
 
 
+def node_container_name(name, index: int) -> str:
+    return f"{env.PREFIX}_node-{name if name else index}"
+
+
 def generate_runid():
     dt = datetime.now()
     s = dt.strftime("%Y-%m-%d_%H-%M-%S")
@@ -392,6 +480,12 @@ class NanoNet:
         self.__default_ledger = None
         self.node_env = dotenv.dotenv_values("node.env")
         self.network_name = f"{env.PREFIX}_network"
+        self.__broadcaster: NanoNetBroadcaster = None
+        self.__broadcaster_pool: NanoNetBroadcasterPool = None
+        self.block_cache = BlockCache()
+        self.__confirmation_tracker: ConfirmationTracker = None
+        self.__metrics_collector: MetricsCollector = None
+        self.__reserve_lock = threading.Lock()
 
     @classmethod
     @contextmanager
@@ -447,7 +541,7 @@ class NanoNet:
             print("attach node:", container.name)
 
             self.__node_containers.append(container)
-            node = NanoNode(container, self.node_env)
+            node = NanoNode(container, self.node_env, self.block_cache)
             self.nodes.append(node)
 
             pass
@@ -472,15 +566,31 @@ class NanoNet:
             data[node.name] = d
         return data
 
+    # Streams the data of every node to `directory`/<node name>.tar, returns the paths for `NanoNet.load`
+    @title_bar(name="SAVE NANONET")
+    def save_to(self, directory) -> dict[str, str]:
+        os.makedirs(directory, exist_ok=True)
+        paths = {}
+        for node in self.nodes:
+            node.stop()
+            path = os.path.join(directory, f"{node.name}.tar")
+            node.pull_data_to(path, ignored_files=IGNORED_FILES)
+            paths[node.name] = path
+        return paths
+
+    # `data` maps node names to archives, as bytes or anything `NanoNode.push_data` streams from (eg. paths)
     @title_bar(name="LOAD NANONET")
     def __load(self, data):
-        for i, (name, d) in enumerate(data.items()):
-            print("loading node:", name, "data:", len(d))
-            self.create_node(name=name, data=d)
+        for name, d in data.items():
+            print("loading node:", name, "data:", len(d) if isinstance(d, bytes) else d)
+        self.create_nodes([{"name": name, "data": d} for name, d in data.items()])
 
     def stop(self):
+        self.close_broadcaster()
+        self.close_confirmation_tracker()
+        self.close_metrics_collector()
+        WorkEngine.close_default()
         # self.__cleanup_docker()
-        pass
 
     def __setup_burn(self):
         burn_amount = int(self.node_env["NANO_TEST_BURN_AMOUNT_RAW"])
@@ -503,12 +613,28 @@ class NanoNet:
             self.network = docker_client.networks.create(self.network_name, check_duplicate=True)
 
     @title_bar(name="CLEANUP DOCKER")
-    def __cleanup_docker(self):
-        # Remove all containers
-        for cont in docker_client.containers.list(all=True):
-            if cont.name.startswith(env.PREFIX):
-                print("Removing container:", cont.name)
+    def __cleanup_docker(self, max_workers=16):
+        start = time.monotonic()
+
+        # Filtered server side, name filter still matches containers created before labels were added
+        containers = {}
+        for filters in ({"label": f"{env.PREFIX_LABEL}={env.PREFIX}"}, {"name": f"^/?{re.escape(env.PREFIX)}"}):
+            for cont in docker_client.containers.list(all=True, filters=filters, sparse=True):
+                name = cont.attrs["Names"][0].lstrip("/")
+                if name.startswith(env.PREFIX):
+                    containers[cont.id] = (cont, name)
+
+        def remove(cont, name):
+            print("Removing container:", name)
+            try:
                 cont.remove(force=True)
+            except docker.errors.NotFound:
+                pass
+
+        # Remove all containers
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cleanup") as executor:
+            list(executor.map(lambda item: remove(*item), containers.values()))
+        print(f"Removed containers: {len(containers)} | {time.monotonic() - start:.2f} s")
 
         # Remove the network
         try:
@@ -519,6 +645,10 @@ class NanoNet:
             print("Could not remove network:", e)
             pass
 
+    # Every container of a run is labelled with the prefix, which lets cleanup filter on the docker side
+    def __container_labels(self) -> dict:
+        return {env.PREFIX_LABEL: env.PREFIX, "runid": self.runid}
+
     def set_default_ledger(self, ledger):
         self.__default_ledger = ledger
 
@@ -531,7 +661,7 @@ class NanoNet:
         name=None,
         cpu_limit: int = env.CPU_LIMIT,  # None for unlimited
         track=True,
-        prom_exporter=True,
+        prom_exporter=not env.METRICS_COLLECTOR,
         ledger: bytes = None,
         ledger_path: str = None,
         data: bytes = None,
@@ -540,11 +670,18 @@ class NanoNet:
         rpc_port: int = None,
         redirect_realtime=True,
         realtime_port: int = None,
+        websocket=env.WEBSOCKET,
+        websocket_port: int = None,
         use_ramdisk=env.RAMDISK,
         tcpdump=env.TCPDUMP,
+        index: int = None,  # reserved up front by `create_nodes`
+        peer_name: str = None,
     ) -> NanoNode:
         print("name:", name)
 
+        if index is None:
+            index = self.__reserve_nodes(1)
+
         # Ensure that only one of the params is set
         assert sum(x is not None for x in (ledger, ledger_path, data, data_path)) <= 1
 
@@ -554,6 +691,10 @@ class NanoNet:
 
         node_cli_options = f"--network={self.network_type} --data_path {env.NANO_DATA_PATH}"
 
+        if websocket:
+            websocket_config = "--config node.websocket.enable=true --config node.websocket.address=::ffff:0.0.0.0"
+            node_cli_options = f"{node_cli_options} {websocket_config}"
+
         if tcpdump:
             node_cli_options = f"delay {node_cli_options}"
 
@@ -562,9 +703,11 @@ class NanoNet:
 
         node_env = self.node_env
 
-        if not do_not_peer and len(self.nodes) > 0:
+        if not do_not_peer and not peer_name and len(self.nodes) > 0:
             # peer_name = self.genesis.node.container.name
             peer_name = self.nodes[0].container.name
+
+        if not do_not_peer and peer_name:
             print("peer name:", peer_name)
             node_env = {
                 "NANO_DEFAULT_PEER": peer_name,
@@ -578,10 +721,7 @@ class NanoNet:
                 **node_env,
             }
 
-        if not name:
-            name = f"{env.PREFIX}_node-{len(self.__node_containers)}"
-        else:
-            name = f"{env.PREFIX}_node-{name}"
+        name = node_container_name(name, index)
 
         if cpu_limit:
             assert cpu_limit > 0
@@ -612,18 +752,25 @@ class NanoNet:
         ports = {}
         if redirect_rpc:
             if not rpc_port and env.BASE_RPC_PORT:
-                rpc_port = env.BASE_RPC_PORT + len(self.__node_containers)
+                rpc_port = env.BASE_RPC_PORT + index
             ports = {
                 env.RPC_PORT: rpc_port,
                 **ports,
             }
         if redirect_realtime:
             if not realtime_port and env.BASE_REALTIME_PORT:
-                realtime_port = env.BASE_REALTIME_PORT + len(self.__node_containers)
+                realtime_port = env.BASE_REALTIME_PORT + index
             ports = {
                 env.REALTIME_PORT: realtime_port,
                 **ports,
             }
+        if websocket:
+            if not websocket_port and env.BASE_WEBSOCKET_PORT:
+                websocket_port = env.BASE_WEBSOCKET_PORT + index
+            ports = {
+                env.WEBSOCKET_PORT: websocket_port,
+                **ports,
+            }
         print("ports:", ports)
 
         tmpfs = None
@@ -633,7 +780,7 @@ class NanoNet:
             else:
                 tmpfs = {"/root/Nano/": ""}
 
-        labels = {"runid": self.runid}
+        labels = self.__container_labels()
 
         # network throttling
         labels = {
@@ -658,9 +805,9 @@ class NanoNet:
             cap_add=["NET_ADMIN"],
         )
 
-        self.__node_containers.append(container)
+        self.__node_containers[index] = container
 
-        node = NanoNode(container, self.node_env)
+        node = NanoNode(container, self.node_env, self.block_cache)
 
         if track:
             self.nodes.append(node)
@@ -684,8 +831,90 @@ class NanoNet:
 
         node.ensure_started()
 
+        if track:
+            self.__collect_metrics(node)
+
         return node
 
+    # Provisions nodes concurrently, `specs` are `create_node` arguments per node (or a node count),
+    # `kwargs` apply to all.
+    # Indices, names, ports and the peering target are fixed before any node starts, so the result matches sequential
+    # `create_node` calls, including node order.
+    @title_bar(name="CREATE NODES")
+    def create_nodes(self, specs: Union[int, list[dict]], max_workers=8, track=True, **kwargs) -> list[NanoNode]:
+        if isinstance(specs, int):
+            specs = [{} for _ in range(specs)]
+        specs = [{**kwargs, **spec} for spec in specs]
+        if not specs:
+            return []
+        reserved = {key for spec in specs for key in spec if key in {"index", "peer_name", "track"}}
+        if reserved:
+            raise ValueError(f"create_nodes assigns {sorted(reserved)} itself")
+        start = self.__reserve_nodes(len(specs))
+
+        if self.nodes:
+            peer_name = self.nodes[0].container.name
+        else:
+            # as in sequential creation the first node has no peer and becomes the peering target of the rest
+            peer_name = node_container_name(specs[0].get("name"), start)
+            specs[0] = {**specs[0], "do_not_peer": True}
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="create-node") as executor:
+            futures = [
+                executor.submit(self.create_node, **spec, track=False, index=start + i, peer_name=peer_name)
+                for i, spec in enumerate(specs)
+            ]
+        failed = [i for i, future in enumerate(futures) if future.exception()]
+        nodes = [future.result() for future in futures if not future.exception()]
+
+        if failed:
+            # the batch is created entirely or not at all, nodes already started are removed with their sidecars
+            for node in nodes:
+                node.rpc_node.close()
+            for i in range(len(specs)):
+                self.__remove_node_container(start + i)
+            raise futures[failed[0]].exception()
+
+        if track:
+            for node in nodes:
+                self.nodes.append(node)
+                self.__collect_metrics(node)
+        return nodes
+
+    # Reserves consecutive node indices, which determine default names and host ports
+    def __reserve_nodes(self, count: int) -> int:
+        with self.__reserve_lock:
+            start = len(self.__node_containers)
+            self.__node_containers.extend([None] * count)
+        return start
+
+    # Removes the node container of a reserved index, along with its tcpdump and prom exporter containers
+    def __remove_node_container(self, index: int):
+        container = self.__node_containers[index]
+        if container is None:
+            return
+        node_name = container.name.replace(f"{env.PREFIX}_", "")
+        for sidecar in (f"{env.PREFIX}_tcpdump_{node_name}", f"{env.PREFIX}_promexport_{node_name}"):
+            try:
+                docker_client.containers.get(sidecar).remove(force=True)
+                print("Removed:", sidecar)
+            except docker.errors.NotFound:
+                pass
+            except Exception as e:
+                print("Could not remove:", sidecar, e)
+        try:
+            print("Removing node:", container.name)
+            container.remove(force=True)
+        except Exception as e:
+            print("Could not remove node:", e)
+
+    # Only started nodes are sampled, the collector talks to them over RPC
+    def __collect_metrics(self, node: NanoNode):
+        if env.METRICS_COLLECTOR:
+            collector = self.metrics_collector()
+            if node not in collector.nodes:
+                collector.add_node(node)
+
     def create_prom_exporter(self, node: NanoNode):
         command = (
             f"--host 127.0.0.1 --port {node.host_rpc_port} --hostname {node.name} --interval 1 --runid {self.runid}"
@@ -701,6 +930,7 @@ class NanoNet:
             network_mode="host",
             pid_mode=f"container:{node.container.id}",
             restart_policy={"Name": "always"},
+            labels=self.__container_labels(),
         )
 
         print("Started exporter:", container.name)
@@ -721,19 +951,132 @@ class NanoNet:
             name=container_name,
             network_mode=f"container:{node.container.id}",
             volumes=volumes,
+            labels=self.__container_labels(),
         )
 
         print("Started tcpdump:", container.name)
 
-    def ensure_all_confirmed(self, blocks=None, populate_backlog=False):
-        ensure_all_confirmed(self.nodes, blocks=blocks, populate_backlog=populate_backlog)
+    def ensure_all_confirmed(self, blocks=None, populate_backlog=False, timeout: float = None) -> NetStatus:
+        return ensure_all_confirmed(self.nodes, blocks=blocks, populate_backlog=populate_backlog, timeout=timeout)
+
+    def status(self) -> NetStatus:
+        return StatusPoller(self.nodes).snapshot_sync()
+
+    # Long lived broadcaster with warm channels, recreated only when nodes or channel count change
+    def broadcaster(self, channels=1) -> NanoNetBroadcaster:
+        current = self.__broadcaster
+        if current and (current.nodes != self.nodes or current.channels != channels):
+            current.close()
+            current = None
+        if not current:
+            current = NanoNetBroadcaster(self, channels=channels)
+            self.__broadcaster = current
+        return current
+
+    # Multi-process broadcaster for large node counts, recreated only when nodes or settings change
+    def broadcaster_pool(self, processes=None, channels=1) -> NanoNetBroadcasterPool:
+        current = self.__broadcaster_pool
+        if current and (
+            current.nodes != self.nodes
+            or current.channels != channels
+            or (processes and current.processes != min(processes, len(self.nodes)))
+        ):
+            current.close()
+            current = None
+        if not current:
+            current = NanoNetBroadcasterPool(self, processes=processes, channels=channels)
+            self.__broadcaster_pool = current
+        return current
+
+    # Websocket confirmation subscribers of all nodes started with `websocket=True`, created on first use
+    def confirmation_tracker(self) -> ConfirmationTracker:
+        if self.__confirmation_tracker is None:
+            urls = {node.name: node.websocket_address for node in self.nodes if node.host_websocket_port}
+            assert urls, "No node has a websocket port, create nodes with websocket=True"
+            self.__confirmation_tracker = ConfirmationTracker(urls)
+        return self.__confirmation_tracker
+
+    def close_confirmation_tracker(self):
+        if self.__confirmation_tracker:
+            self.__confirmation_tracker.close()
+            self.__confirmation_tracker = None
+
+    # Single in process collector sampling every node, nodes created later are added to it
+    def metrics_collector(self, interval=env.METRICS_INTERVAL, stats=env.METRICS_STATS) -> MetricsCollector:
+        if self.__metrics_collector is None:
+            self.__metrics_collector = MetricsCollector(self.nodes, interval=interval, stats=stats)
+            self.__metrics_collector.start()
+        return self.__metrics_collector
+
+    # Stops sampling and exports the collected series to `path` (without extension), by default under METRICS_PATH
+    def close_metrics_collector(self, path: str = None, formats=env.METRICS_EXPORT):
+        collector = self.__metrics_collector
+        if collector:
+            collector.stop()
+            self.__metrics_collector = None
+            if formats and len(collector.series):
+                path = path or os.path.join(env.METRICS_PATH, self.runid)
+                collector.series.export(path, formats, labels={"runid": self.runid})
+
+    # Records a scenario, the JSON report is saved under METRICS_PATH
+    # so runs of different NODE_IMAGE builds can be compared
+    @contextmanager
+    def record(self, name="run", interval=0.5, path: str = None):
+        meta = {
+            "runid": self.runid,
+            "node_image": env.NODE_IMAGE,
+            "images": {node.name: node.container.attrs["Config"]["Image"] for node in self.nodes},
+            "node_flags": env.NODE_FLAGS,
+            "cpu_limit": env.CPU_LIMIT,
+        }
+        recorder = RunRecorder(
+            self.nodes, name=name, interval=interval, meta=meta, tracker=self.__confirmation_tracker
+        )
+        with recorder:
+            yield recorder
+        report = recorder.report()
+        report.print()
+        report.save(path or os.path.join(env.METRICS_PATH, f"{self.runid}_{name}.json"))
+
+    def close_broadcaster(self):
+        if self.__broadcaster:
+            self.__broadcaster.close()
+            self.__broadcaster = None
+        if self.__broadcaster_pool:
+            self.__broadcaster_pool.close()
+            self.__broadcaster_pool = None
 
     @title_bar(name="BROADCAST PARALLEL (NANONET)")
-    def broadcast_parallel(self, blocks: list[dict]):
+    def broadcast_parallel(self, blocks: list[dict], pipelined=False, channels=1, **kwargs):
         print("Broadcasting:", len(blocks))
-        global broadcaster  # to avoid python bug where it just hangs when exiting function
-        broadcaster = NanoNetBroadcaster(self)
-        broadcaster.publish_all(blocks)
+        self.broadcaster(channels).publish_all(blocks, pipelined=pipelined, **kwargs)
+
+    @title_bar(name="BROADCAST SHARDED (NANONET)")
+    def broadcast_sharded(self, blocks, policy: ShardingPolicy = None, replicas=1, channels=1, **kwargs) -> float:
+        print("Broadcasting:", len(blocks))
+        return self.broadcaster(channels).publish_sharded(blocks, policy=policy, replicas=replicas, **kwargs)
+
+    @title_bar(name="BROADCAST MULTIPROCESS (NANONET)")
+    def broadcast_multiprocess(self, blocks, processes=None, channels=1, **kwargs) -> float:
+        print("Broadcasting:", len(blocks))
+        return self.broadcaster_pool(processes, channels).publish_all(blocks, **kwargs)
+
+    # Queues a broadcasting round on the background broadcaster and returns immediately
+    def submit_broadcast(self, blocks: list[dict], pipelined=False, channels=1, **kwargs) -> Future:
+        broadcaster = self.broadcaster(channels)
+        return broadcaster.submit(broadcaster.async_publish_all, blocks, pipelined=pipelined, **kwargs)
+
+    @title_bar(name="BROADCAST PACED (NANONET)")
+    def broadcast_paced(self, blocks, profile: LoadProfile, channels=1, **kwargs) -> RateReport:
+        print("Broadcasting:", len(blocks))
+        return self.broadcaster(channels).publish_paced(blocks, profile, **kwargs)
+
+    # Broadcasts blocks while they are still being generated, runs on a background thread until the queue is closed
+    def broadcast_stream(self, block_queue: BlockQueue, pipelined=False, channels=1, **kwargs):
+        broadcaster = self.broadcaster(channels)
+        return block_queue.run_consumer(
+            lambda block_queue: broadcaster.publish_stream(block_queue, pipelined=pipelined, **kwargs)
+        )
 
 
 def random_chain() -> Chain:
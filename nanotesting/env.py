@@ -7,22 +7,44 @@ env.read_env()
 
 # prefix for all docker container names
 PREFIX = env("NANO_FULLNET_PREFIX", default="fullnet")
+# label holding the prefix on every container created
+PREFIX_LABEL = "nanotesting.prefix"
 
 # RPC
 RPC_PORT = 17076
 BASE_RPC_PORT = env.int("NANO_FULLNET_RPC_PORT", default=28000)
+# WEBSOCKET
+WEBSOCKET_PORT = 17078
+BASE_WEBSOCKET_PORT = env.int("NANO_FULLNET_WEBSOCKET_PORT", default=48000)
+WEBSOCKET = env.bool("NANO_FULLNET_WEBSOCKET", False)
 # REALTIME
 REALTIME_PORT = 17075
 BASE_REALTIME_PORT = env.int("NANO_FULLNET_REALTIME_PORT", default=38000)
 
+# max in flight requests per node for the pooled RPC client
+RPC_CONCURRENCY = env.int("NANO_FULLNET_RPC_CONCURRENCY", 64)
+# parsed blocks kept per network for node block lookups
+BLOCK_CACHE_SIZE = env.int("NANO_FULLNET_BLOCK_CACHE_SIZE", 100000)
+# seconds without any batch before BlockQueue consumers give up, eg. when a producer process died before finishing
+BLOCK_QUEUE_TIMEOUT = env.float("NANO_FULLNET_BLOCK_QUEUE_TIMEOUT", 300.0)
+
 if BASE_RPC_PORT == 0:
     BASE_RPC_PORT = None
 if BASE_REALTIME_PORT == 0:
     BASE_REALTIME_PORT = None
+if BASE_WEBSOCKET_PORT == 0:
+    BASE_WEBSOCKET_PORT = None
+
+# realtime message header versions, must be within the range accepted by NODE_IMAGE
+PROTOCOL_VERSION = env.int("NANO_FULLNET_PROTOCOL_VERSION", 0x14)
+PROTOCOL_VERSION_MIN = env.int("NANO_FULLNET_PROTOCOL_VERSION_MIN", 0x12)
 
 BURN_ACCOUNT = "nano_1111111111111111111111111111111111111111111111111111hifc8npp"
 DEFAULT_REPR = BURN_ACCOUNT
-DIFFICULTY = "0000000000000000"
+DIFFICULTY = env("NANO_FULLNET_DIFFICULTY", default="0000000000000000")
+
+WORK_PROCESSES = env.int("NANO_FULLNET_WORK_PROCESSES", 0)  # 0 for all cores
+WORK_CACHE_PATH = env("NANO_FULLNET_WORK_CACHE_PATH", default="/data-raid/nanotesting-cache/work.sqlite")
 
 NODE_IMAGE = env("NANO_FULLNET_NODE_IMAGE", default="nano-node")
 PROM_IMAGE = env("NANO_FULLNET_PROM_IMAGE", default="nano-prom-exporter")
@@ -37,6 +59,14 @@ if CPU_LIMIT == 0:
 RAMDISK = env.bool("NANO_FULLNET_RAMDISK", False)
 TCPDUMP = env.bool("NANO_FULLNET_TCPDUMP", False)
 
+# in process metrics collector instead of one prom exporter container per node
+METRICS_COLLECTOR = env.bool("NANO_FULLNET_METRICS_COLLECTOR", False)
+METRICS_INTERVAL = env.float("NANO_FULLNET_METRICS_INTERVAL", 1.0)
+METRICS_PATH = env.path("NANO_FULLNET_METRICS_PATH", default="/data-raid/fullnet-metrics/")
+METRICS_EXPORT = env.list("NANO_FULLNET_METRICS_EXPORT", default=["prom", "csv"])  # prom, csv, parquet
+# node stats counter prefixes sampled by the collector (`{type}_{detail}_{dir}`), empty for none
+METRICS_STATS = env.list("NANO_FULLNET_METRICS_STATS", default=["ledger_", "election_", "confirmation_height_"])
+
 TCPDUMP_PATH = env.path("NANO_FULLNET_TCPDUMP_PATH", default="/data-raid/fullnet-tcpdump/")
 
 DEFAULT_NODE_FLAGS = [
@@ -55,9 +85,14 @@ def print_env_info():
     print("NETSHOOT_IMAGE:", NETSHOOT_IMAGE)
     print("BASE_RPC_PORT:", BASE_RPC_PORT)
     print("BASE_REALTIME_PORT:", BASE_REALTIME_PORT)
+    print("RPC_CONCURRENCY:", RPC_CONCURRENCY)
+    print("WEBSOCKET:", WEBSOCKET, "base port:", BASE_WEBSOCKET_PORT)
+    print("PROTOCOL_VERSION:", PROTOCOL_VERSION, "min:", PROTOCOL_VERSION_MIN)
     print("BURN_ACCOUNT:", BURN_ACCOUNT)
     print("DIFFICULTY:", DIFFICULTY)
+    print("WORK_PROCESSES:", WORK_PROCESSES)
     print("CPU_LIMIT:", CPU_LIMIT)
     print("RAMDISK:", RAMDISK)
+    print("METRICS_COLLECTOR:", METRICS_COLLECTOR, "export:", METRICS_EXPORT, "stats:", METRICS_STATS)
     print("DEFAULT_NODE_FLAGS:", DEFAULT_NODE_FLAGS)
     print("NODE_FLAGS:", NODE_FLAGS)
@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+
+from .block_queue import BlockQueue
+from .chain import Block, Chain, NlibBlock
+from .common import *
+from .store import *
+from .wire import *
+from .work import WorkEngine
+
+
+def _chain_state(chain: Chain):
+    if not chain.frontier:
+        raise ValueError("Account not opened")
+    # Only the serialized frontier is shipped to the worker, not the whole chain history
+    if isinstance(chain.frontier, Block):
+        return chain.account_id, chain.private_key, chain.frontier.data, chain.frontier.hash_bytes
+    if isinstance(chain.frontier, NlibBlock) and chain.frontier.block_nlib.block_type == "state":
+        # fetched from a node, not in the store
+        return chain.account_id, chain.private_key, *encode_nlib_block(chain.frontier.block_nlib)
+    raise ValueError("Chain frontier must be a state block")
+
+
+def _generate_pairs_worker(states: list, count: int, amount: int) -> list[bytes]:
+    store = BlockStore.default()
+
+    results = []
+    for account_id, private_key, frontier_data, frontier_hash in states:
+        chain = Chain(account_id, private_key, Block(store, store.append(frontier_data, frontier_hash)))
+
+        result = bytearray()
+        for _ in range(count):
+            send = chain.create_send(chain, amount)
+            chain.frontier = send
+            receive = chain.create_receive(send)
+            chain.frontier = receive
+            result += send.data + send.hash_bytes
+            result += receive.data + receive.hash_bytes
+
+        results.append(bytes(result))
+    return results
+
+
+# Generates `count` send/receive pairs (each chain sends `amount` to itself and receives it back) for every chain.
+# Chains are sharded across a process pool, blocks are put into the default BlockQueue chain by chain
+# and chain frontiers are advanced exactly as if `Chain.send` / `Chain.receive` were called serially.
+@title_bar(name="GENERATE SEND/RECEIVE PAIRS")
+def generate_send_receive_pairs(chains: list[Chain], count: int, amount=1, processes=None) -> int:
+    if count <= 0 or not chains:
+        return 0
+
+    processes = min(processes or os.cpu_count(), len(chains))
+    print("chains:", len(chains), "pairs per chain:", count, "processes:", processes)
+
+    shards = [chains[i::processes] for i in range(processes)]
+    args = [([_chain_state(chain) for chain in shard], count, amount) for shard in shards]
+
+    # the first block of every chain is solved in bulk on the work pool (and cached), workers solve the rest inline
+    WorkEngine.default().solve_all([chain.frontier.block_hash for chain in chains])
+
+    with multiprocessing.Pool(processes) as pool:
+        shard_results = pool.starmap(_generate_pairs_worker, args)
+
+    store = BlockStore.default()
+    block_queue = BlockQueue.default()
+    total = 0
+    for shard, results in zip(shards, shard_results):
+        for chain, result in zip(shard, results):
+            # Packed blocks go to the queue as is, only the last send/receive pair is kept as the new frontier
+            block_queue.put_packed(result)
+            blocks = PackedBlocks(result)
+            send, receive = blocks[-2], blocks[-1]
+            # the send follows the old frontier only for a single pair, earlier pairs are not kept in the store
+            in_store = isinstance(chain.frontier, Block) and chain.frontier.store is store
+            prev_slot = chain.frontier.slot if count == 1 and in_store else -1
+            send_slot = store.append(send.data, send.hash_bytes, prev_slot)
+            chain.frontier = Block(store, store.append(receive.data, receive.hash_bytes, send_slot))
+            total += len(blocks)
+
+    print("generated blocks:", total)
+    return total
@@ -1,6 +1,9 @@
+import asyncio
 from typing import Union
-from .docker import NanoNode, NanoNodeRPC
+from .common import hash_from_block, title_bar
+from .docker import NanoNet, NanoNode, NanoNodeRPC, extract_nodes
 from .block_queue import BlockQueue
+from .rpc import ProcessResult, rpc_loop, timed_process_blocks
 
 
 def process_block_queue(block_queue: BlockQueue, node: Union[NanoNode, NanoNodeRPC], async_process=True):
@@ -8,9 +11,50 @@ def process_block_queue(block_queue: BlockQueue, node: Union[NanoNode, NanoNodeR
     return cnt, hashes
 
 
-def process_blocks(blocks: list, node: Union[NanoNode, NanoNodeRPC], async_process=False):
-    for block in blocks:
-        node.process_block(block, async_process=async_process)
+# Flushes the queue into every node at once, each over `connections` concurrent lanes (default: the RPC concurrency).
+# Blocks of one account share a lane, so chains are never sent out of order.
+@title_bar(name="PROCESS BLOCK QUEUE")
+def process_block_queue_parallel(
+    block_queue: BlockQueue, nodes: Union[NanoNet, NanoNode, list[NanoNode]], async_process=True, connections=None
+) -> list[ProcessResult]:
+    nodes = extract_nodes(nodes)
+    # decoded and hashed once, shared by all nodes
+    queued = block_queue.get_all()
+    blocks = [block.to_dict() for block in queued]
+    hashes = [hash_from_block(block) for block in queued]
+    print("processing:", len(blocks), "nodes:", len(nodes))
+
+    async def process_all():
+        return await asyncio.gather(
+            *[
+                timed_process_blocks(
+                    node.rpc_node.pool.client,
+                    node.name,
+                    blocks,
+                    async_process=async_process,
+                    lanes=connections,
+                    hashes=hashes,
+                )
+                for node in nodes
+            ]
+        )
+
+    results = rpc_loop().run(process_all())
+    for res in results:
+        print(
+            f"{res.name: <32} | blocks: {len(res.results): >9} | errors: {len(res.errors): >6} | "
+            f"{res.elapsed: >7.2f} s | {res.rate: >8.0f} blocks/s"
+        )
+    return results
+
+
+# Streams blocks into the node as they are generated, run on a background thread until the queue is closed
+def stream_block_queue(block_queue: BlockQueue, node: Union[NanoNode, NanoNodeRPC], async_process=True):
+    return block_queue.consume(lambda block: node.process_block(block, async_process=async_process))
+
+
+def process_blocks(blocks: list, node: Union[NanoNode, NanoNodeRPC], async_process=False, **kwargs):
+    return node.process_blocks(blocks, async_process=async_process, **kwargs)
 
 
 # TODO: REMOVE, USES CUSTOM EXPERIMENTAL RPC
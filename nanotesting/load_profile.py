@@ -0,0 +1,127 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Protocol
+
+
+class LoadProfile(Protocol):
+    # Total duration in seconds, None to run until blocks are exhausted
+    duration: float
+
+    def rate_at(self, elapsed: float) -> float:
+        # target blocks/sec at `elapsed` seconds since start
+        pass
+
+
+@dataclass
+class ConstantRate:
+    rate: float
+    duration: float = None
+
+    def rate_at(self, elapsed: float) -> float:
+        return self.rate
+
+
+@dataclass
+class StepRate:
+    rates: list[float]
+    step_duration: float
+
+    @property
+    def duration(self) -> float:
+        return len(self.rates) * self.step_duration
+
+    def rate_at(self, elapsed: float) -> float:
+        return self.rates[min(int(elapsed // self.step_duration), len(self.rates) - 1)]
+
+
+@dataclass
+class RampRate:
+    start: float
+    end: float
+    duration: float
+
+    def rate_at(self, elapsed: float) -> float:
+        progress = min(max(elapsed / self.duration, 0.0), 1.0)
+        return self.start + (self.end - self.start) * progress
+
+
+@dataclass
+class BurstRate:
+    base: float
+    burst: float
+    period: float
+    burst_duration: float
+    duration: float = None
+
+    def rate_at(self, elapsed: float) -> float:
+        return self.burst if elapsed % self.period < self.burst_duration else self.base
+
+
+# Token bucket whose refill rate follows a load profile
+class TokenBucket:
+    def __init__(self, profile: LoadProfile, burst: int):
+        self.profile = profile
+        self.burst = burst
+        self.tokens = 0.0
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.offered = 0.0  # tokens generated so far, ie. the offered load
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def __refill(self):
+        now = time.perf_counter()
+        # midpoint rate approximates the integral for changing profiles
+        rate = self.profile.rate_at(((self.last + now) / 2) - self.start)
+        added = (now - self.last) * rate
+        self.offered += added
+        self.tokens = min(self.burst, self.tokens + added)
+        self.last = now
+        return rate
+
+    async def acquire(self, count: int):
+        assert count <= self.burst, "Cannot acquire more tokens than the bucket holds"
+        while True:
+            rate = self.__refill()
+            if self.tokens >= count:
+                self.tokens -= count
+                return
+            wait = (count - self.tokens) / rate if rate > 0 else 0.05
+            await asyncio.sleep(min(wait, 0.05))
+
+
+class RateReport:
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.offered: list[float] = []
+        self.achieved: list[int] = []
+
+    def __bin(self, elapsed: float) -> int:
+        index = int(elapsed // self.interval)
+        while len(self.achieved) <= index:
+            self.offered.append(0.0)
+            self.achieved.append(0)
+        return index
+
+    def record(self, elapsed: float, offered: float, achieved: int):
+        index = self.__bin(elapsed)
+        self.offered[index] += offered
+        self.achieved[index] += achieved
+
+    def rows(self) -> list[dict]:
+        return [
+            {
+                "time": index * self.interval,
+                "offered_bps": offered / self.interval,
+                "achieved_bps": achieved / self.interval,
+            }
+            for index, (offered, achieved) in enumerate(zip(self.offered, self.achieved))
+        ]
+
+    def print(self):
+        print(f"{'time': >8} | {'offered bps': >12} | {'achieved bps': >12}")
+        for row in self.rows():
+            print(f"{row['time']: >8.2f} | {row['offered_bps']: >12.0f} | {row['achieved_bps']: >12.0f}")
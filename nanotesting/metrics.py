@@ -0,0 +1,198 @@
+import asyncio
+import csv
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from .rpc import rpc_loop
+
+
+# Samples of all nodes in preallocated columnar arrays, one (samples x nodes) array per metric.
+# Arrays double in size when full, nodes added later have NaN for earlier samples.
+# float32 halves the memory of large series, counters above 2**24 then lose precision.
+class MetricSeries:
+    def __init__(self, nodes: list[str] = None, capacity=3600, dtype=np.float64):
+        self.nodes = list(nodes or [])
+        self.capacity = capacity
+        self.dtype = dtype
+        self.size = 0
+        self.times = np.zeros(capacity)
+        self.columns: dict[str, np.ndarray] = {}
+        self.lock = threading.Lock()
+
+    def __column(self, metric: str) -> np.ndarray:
+        if metric not in self.columns:
+            self.columns[metric] = np.full((self.capacity, len(self.nodes)), np.nan, dtype=self.dtype)
+        return self.columns[metric]
+
+    def __grow(self):
+        self.times = np.concatenate([self.times, np.zeros(self.capacity)])
+        for metric, column in self.columns.items():
+            self.columns[metric] = np.concatenate([column, np.full(column.shape, np.nan, dtype=self.dtype)])
+        self.capacity *= 2
+
+    def add_node(self, name: str):
+        with self.lock:
+            self.nodes.append(name)
+            for metric, column in self.columns.items():
+                self.columns[metric] = np.concatenate(
+                    [column, np.full((self.capacity, 1), np.nan, dtype=self.dtype)], axis=1
+                )
+
+    # `values` holds one {metric: value} dict per node, in node order
+    def append(self, timestamp: float, values: list[dict[str, float]]):
+        with self.lock:
+            if self.size == self.capacity:
+                self.__grow()
+            self.times[self.size] = timestamp
+            for index, node_values in enumerate(values):
+                for metric, value in node_values.items():
+                    self.__column(metric)[self.size, index] = value
+            self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.times[: self.size]
+
+    @property
+    def metrics(self) -> list[str]:
+        return list(self.columns)
+
+    def __getitem__(self, metric: str) -> np.ndarray:
+        return self.columns[metric][: self.size]
+
+    def node(self, name: str, metric: str) -> np.ndarray:
+        return self[metric][:, self.nodes.index(name)]
+
+    # Per second rate of a counter between consecutive samples, (samples - 1 x nodes)
+    def rate(self, metric: str) -> np.ndarray:
+        return np.diff(self[metric], axis=0) / np.diff(self.timestamps)[:, None]
+
+    def to_prometheus(self, path: str, prefix="nano", labels: dict = None):
+        labels = "".join(f',{key}="{value}"' for key, value in (labels or {}).items())
+        timestamps = (self.timestamps * 1000).astype(np.int64)
+        with open(path, "w") as f:
+            for metric in self.metrics:
+                name = re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{metric}")
+                f.write(f"# TYPE {name} gauge\n")
+                values = self[metric]
+                for index, node in enumerate(self.nodes):
+                    for timestamp, value in zip(timestamps, values[:, index]):
+                        if not np.isnan(value):
+                            f.write(f'{name}{{node="{node}"{labels}}} {value:g} {timestamp}\n')
+
+    # Long format, one row per sample and node
+    def to_csv(self, path: str):
+        metrics = self.metrics
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["time", "node", *metrics])
+            columns = [self[metric] for metric in metrics]
+            for row, timestamp in enumerate(self.timestamps):
+                for index, node in enumerate(self.nodes):
+                    writer.writerow([timestamp, node, *[column[row, index] for column in columns]])
+
+    def to_parquet(self, path: str):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow")
+
+        nodes = len(self.nodes)
+        table = {
+            "time": np.repeat(self.timestamps, nodes),
+            "node": np.tile(np.array(self.nodes, dtype=object), self.size),
+            **{metric: self[metric].reshape(-1) for metric in self.metrics},
+        }
+        pyarrow.parquet.write_table(pyarrow.table(table), path)
+
+    def export(self, path: str, formats=("prom", "csv"), **kwargs):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        for fmt in formats:
+            file = f"{path}.{fmt}"
+            if fmt == "prom":
+                self.to_prometheus(file, **kwargs)
+            elif fmt == "csv":
+                self.to_csv(file)
+            elif fmt == "parquet":
+                self.to_parquet(file)
+            else:
+                raise ValueError(f"Unknown metrics format: {fmt}")
+            print("exported metrics:", file)
+
+
+# `stats` is a bool or a list of stats counter prefixes (`{type}_{detail}_{dir}`), every counter sampled takes a
+# (samples x nodes) array
+async def sample_node(node: "NanoNode", stats=True) -> dict[str, float]:
+    try:
+        client = node.rpc_node.pool.client
+        calls = [client.call("block_count"), client.call("confirmation_active"), client.call("peers")]
+        if stats:
+            calls.append(client.call("stats", {"type": "counters"}))
+        block_count, aec, peers, *counters = await asyncio.gather(*calls)
+    except Exception as e:
+        print("metrics error:", node.name, e)
+        return {}
+
+    values = {
+        "checked": int(block_count["count"]),
+        "unchecked": int(block_count["unchecked"]),
+        "cemented": int(block_count["cemented"]),
+        "aec_confirmed": int(aec["confirmed"]),
+        "aec_unconfirmed": int(aec["unconfirmed"]),
+        "peers": len(peers["peers"] or {}),
+    }
+    for entry in counters[0]["entries"] if counters else []:
+        counter = f"{entry['type']}_{entry['detail']}_{entry.get('dir', 'in')}"
+        if stats is True or counter.startswith(tuple(stats)):
+            values[f"stats_{counter}"] = int(entry["value"])
+    return values
+
+
+# Samples all nodes concurrently every `interval` seconds on the shared RPC loop, replaces per node exporter containers
+class MetricsCollector:
+    def __init__(self, nodes: list["NanoNode"] = None, interval=1.0, capacity=3600, stats=True, dtype=np.float64):
+        self.nodes = list(nodes or [])
+        self.interval = interval
+        self.stats = stats
+        self.series = MetricSeries([node.name for node in self.nodes], capacity, dtype)
+        self.__task: asyncio.Task = None
+
+    def add_node(self, node: "NanoNode"):
+        self.series.add_node(node.name)
+        self.nodes.append(node)
+
+    def start(self):
+        assert self.__task is None, "MetricsCollector already started"
+        rpc_loop().run(self.__start())
+
+    # Returns once the sampler task finished, so no sample is appended while the series is exported
+    def stop(self):
+        if self.__task:
+            rpc_loop().run(self.__stop())
+
+    async def __start(self):
+        self.__task = asyncio.create_task(self.__run())
+
+    async def __stop(self):
+        self.__task.cancel()
+        await asyncio.gather(self.__task, return_exceptions=True)
+        self.__task = None
+
+    async def __run(self):
+        next_tick = time.monotonic()
+        while True:
+            timestamp = time.time()
+            nodes = list(self.nodes)
+            values = await asyncio.gather(*[sample_node(node, self.stats) for node in nodes])
+            self.series.append(timestamp, values)
+
+            next_tick += self.interval
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
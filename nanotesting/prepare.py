@@ -68,12 +68,8 @@ def voting_weight_uniform(count, reserved_raw):
         nanonet.set_default_ledger(ledger)
         nanonet.setup_genesis_node()
 
-        def setup_rep_node(idx, key):
-            node = nanonet.create_node(name=f"rep_{idx}")
-            wallet = node.create_wallet(private_key=key)
-            return node, wallet
-
-        reps = [setup_rep_node(idx, key) for idx, key in enumerate(rep_keys)]
+        nodes = nanonet.create_nodes([{"name": f"rep_{idx}"} for idx in range(len(rep_keys))])
+        reps = [(node, node.create_wallet(private_key=key)) for node, key in zip(nodes, rep_keys)]
 
         nanonet.ensure_all_confirmed(populate_backlog=True)
 
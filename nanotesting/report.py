@@ -0,0 +1,198 @@
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+
+from .common import title_bar
+from .metrics import MetricsCollector, MetricSeries
+
+
+@dataclass
+class NodeReport:
+    name: str
+    blocks: int  # checked during the run
+    confirmations: int  # cemented during the run
+    blocks_per_sec: float
+    confirmations_per_sec: float
+    peak_confirmations_per_sec: float
+    aec_max: int
+    time_to_full_cementation: float  # seconds since start, None if never fully cemented
+    lag_p50: float  # seconds between a block being checked and cemented
+    lag_p99: float
+
+
+@dataclass
+class RunReport:
+    name: str
+    meta: dict
+    start: float
+    duration: float
+    samples: int
+    network: dict
+    nodes: list[NodeReport]
+    events: dict[str, float] = field(default_factory=dict)  # seconds since start
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        print("saved report:", path)
+
+    @title_bar(name="RUN REPORT")
+    def print(self):
+        print(f"{self.name} | {self.duration:.2f} s | samples: {self.samples}")
+        for key, value in self.network.items():
+            print(f"  {key}: {value}")
+        for node in self.nodes:
+            print(
+                f"[{node.name: <32} | bps: {node.blocks_per_sec: >8.1f} | cps: {node.confirmations_per_sec: >8.1f} | "
+                f"peak cps: {node.peak_confirmations_per_sec: >8.1f} | full: {_fmt(node.time_to_full_cementation)} | "
+                f"lag p50: {_fmt(node.lag_p50)} p99: {_fmt(node.lag_p99)}]"
+            )
+
+
+def _fmt(value: float) -> str:
+    return f"{value: >7.2f} s" if value is not None else f"{'-': >9}"
+
+
+def _optional(value) -> float:
+    return None if value is None or np.isnan(value) else float(value)
+
+
+# Confirmation lag from block counts: for every cemented level, time it was cemented minus time it was checked
+def count_lags(times: np.ndarray, checked: np.ndarray, cemented: np.ndarray, levels=1000) -> np.ndarray:
+    valid = ~(np.isnan(checked) | np.isnan(cemented))
+    times, checked, cemented = times[valid], checked[valid], cemented[valid]
+    if len(times) < 2 or cemented[-1] <= cemented[0]:
+        return np.array([])
+    grid = np.linspace(cemented[0] + 1, cemented[-1], min(levels, int(cemented[-1] - cemented[0])))
+    # counters never decrease, the running maximum guards against sampling glitches
+    cemented_at = np.interp(grid, np.maximum.accumulate(cemented), times)
+    checked_at = np.interp(grid, np.maximum.accumulate(checked), times)
+    return np.maximum(cemented_at - checked_at, 0.0)
+
+
+def node_report(series: MetricSeries, index: int, start: float) -> NodeReport:
+    times = series.timestamps
+    checked = series["checked"][:, index]
+    cemented = series["cemented"][:, index]
+    unchecked = series["unchecked"][:, index]
+    aec = series["aec_unconfirmed"][:, index]
+
+    valid = ~np.isnan(cemented)
+    duration = times[valid][-1] - times[valid][0] if valid.sum() > 1 else 0.0
+    blocks = int(np.nanmax(checked) - np.nanmin(checked)) if valid.any() else 0
+    confirmations = int(np.nanmax(cemented) - np.nanmin(cemented)) if valid.any() else 0
+
+    rates = np.diff(cemented[valid]) / np.diff(times[valid]) if valid.sum() > 1 else np.array([0.0])
+
+    full = None
+    if valid.any():
+        done = valid & (cemented >= np.nanmax(checked)) & (unchecked == 0)
+        if done.any():
+            full = float(times[np.argmax(done)] - start)
+
+    lags = count_lags(times, checked, cemented)
+    return NodeReport(
+        name=series.nodes[index],
+        blocks=blocks,
+        confirmations=confirmations,
+        blocks_per_sec=blocks / duration if duration > 0 else 0.0,
+        confirmations_per_sec=confirmations / duration if duration > 0 else 0.0,
+        peak_confirmations_per_sec=float(np.nanmax(rates)) if len(rates) else 0.0,
+        aec_max=int(np.nanmax(aec)) if valid.any() else 0,
+        time_to_full_cementation=full,
+        lag_p50=_optional(np.percentile(lags, 50)) if len(lags) else None,
+        lag_p99=_optional(np.percentile(lags, 99)) if len(lags) else None,
+    )
+
+
+def network_summary(nodes: list[NodeReport], lags: np.ndarray) -> dict:
+    full = [node.time_to_full_cementation for node in nodes]
+    return {
+        "nodes": len(nodes),
+        # the network is as fast as its slowest node
+        "blocks_per_sec": min((node.blocks_per_sec for node in nodes), default=0.0),
+        "confirmations_per_sec": min((node.confirmations_per_sec for node in nodes), default=0.0),
+        "confirmations_per_sec_mean": float(np.mean([node.confirmations_per_sec for node in nodes])) if nodes else 0.0,
+        "time_to_full_cementation": None if not full or None in full else max(full),
+        "lag_p50": _optional(np.percentile(lags, 50)) if len(lags) else None,
+        "lag_p99": _optional(np.percentile(lags, 99)) if len(lags) else None,
+    }
+
+
+# Samples block counts and AEC sizes of all nodes during a scenario and turns them into a RunReport.
+# With a ConfirmationTracker, lag percentiles use per block websocket confirmation times
+# of blocks passed to `submitted`.
+class RunRecorder:
+    def __init__(self, nodes: list["NanoNode"], name="run", interval=0.5, meta: dict = None, tracker=None):
+        self.name = name
+        self.meta = meta or {}
+        self.tracker = tracker
+        self.collector = MetricsCollector(nodes, interval=interval, stats=False)
+        self.start: float = None
+        self.end: float = None
+        self.events: dict[str, float] = {}
+        self.submit_times: dict[str, float] = {}
+
+    def __enter__(self) -> "RunRecorder":
+        self.start = time.time()
+        self.collector.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def stop(self):
+        if self.end is None:
+            self.end = time.time()
+            self.collector.stop()
+
+    def mark(self, event: str):
+        self.events[event] = time.time() - self.start
+
+    def submitted(self, hashes: list[str]):
+        now = time.time()
+        for block_hash in hashes:
+            self.submit_times.setdefault(block_hash.upper(), now)
+
+    def block_lags(self) -> np.ndarray:
+        lags = []
+        for subscriber in self.tracker.subscribers if self.tracker else []:
+            for block_hash, submitted in self.submit_times.items():
+                confirmed = subscriber.confirmed.get(block_hash)
+                if confirmed is not None:
+                    lags.append(confirmed - submitted)
+        return np.array(lags)
+
+    def report(self) -> RunReport:
+        series = self.collector.series
+        sampled = "cemented" in series.columns
+        nodes = [node_report(series, index, self.start) for index in range(len(series.nodes))] if sampled else []
+
+        lags = self.block_lags()
+        source = "websocket" if len(lags) else None
+        if not len(lags) and sampled:
+            times = series.timestamps
+            lags = np.concatenate(
+                [count_lags(times, series["checked"][:, i], series["cemented"][:, i]) for i in range(len(nodes))]
+            )
+            source = "block_count"
+
+        network = network_summary(nodes, lags)
+        network["lag_source"] = source
+        return RunReport(
+            name=self.name,
+            meta=self.meta,
+            start=self.start,
+            duration=(self.end or time.time()) - self.start,
+            samples=len(series),
+            network=network,
+            nodes=nodes,
+            events=dict(self.events),
+        )
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+
+import aiohttp
+
+from . import env
+from .common import EventLoopThread, hash_from_block
+from .wire import account_shard, block_public_key
+
+
+class RPCError(Exception):
+    pass
+
+
+def block_to_dict(block) -> dict:
+    if isinstance(block, dict):
+        return block
+    if isinstance(block, str):
+        return json.loads(block)
+    return block.to_dict()
+
+
+# Packed and stored blocks carry their hash, json blocks are hashed from their contents
+def local_block_hash(block, data: dict) -> str:
+    return hash_from_block(block if hasattr(block, "block_hash") else data)
+
+
+# Asyncio RPC client, requests share a pool of keep-alive connections and at most `concurrency` are in flight.
+# The session is bound to the event loop of its first request.
+class AsyncNodeRPC:
+    def __init__(self, rpc_address, concurrency=env.RPC_CONCURRENCY, tries=3, delay=0.5, timeout=30):
+        self.rpc_address = rpc_address
+        self.concurrency = concurrency
+        self.tries = tries
+        self.delay = delay
+        self.timeout = timeout
+        self.__session: aiohttp.ClientSession = None
+        self.__semaphore: asyncio.Semaphore = None
+
+    def __ensure_session(self) -> aiohttp.ClientSession:
+        if self.__session is None or self.__session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self.__session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self.__semaphore = asyncio.Semaphore(self.concurrency)
+        return self.__session
+
+    async def close(self):
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    async def __aenter__(self):
+        self.__ensure_session()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def __post(self, payload: dict) -> dict:
+        session = self.__ensure_session()
+        async with self.__semaphore:
+            async with session.post(self.rpc_address, json=payload) as response:
+                response.raise_for_status()
+                return await response.json(content_type=None)
+
+    async def call(self, action: str, params: dict = None) -> dict:
+        payload = {"action": action, **(params or {})}
+        for attempt in range(self.tries):
+            try:
+                res = await self.__post(payload)
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.tries - 1:
+                    raise
+                # only this request backs off, its connection slot is free for the others meanwhile
+                print("rpc retry:", self.rpc_address, action, e)
+                await asyncio.sleep(self.delay * (attempt + 1))
+        if "error" in res:
+            raise RPCError(f"{action}: {res['error']}")
+        return res
+
+    # Splits `items` over several concurrent calls of at most `chunk_size` items each, passed as `key`
+    async def call_chunked(
+        self, action: str, key: str, items: list, chunk_size=1000, params: dict = None
+    ) -> list[dict]:
+        chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+        return await asyncio.gather(*[self.call(action, {**(params or {}), key: chunk}) for chunk in chunks])
+
+    async def blocks_info(self, hashes: list[str], chunk_size=1000) -> dict[str, dict]:
+        responses = await self.call_chunked("blocks_info", "hashes", list(hashes), chunk_size, {"json_block": "true"})
+        return {block_hash: info for res in responses for block_hash, info in res["blocks"].items()}
+
+    async def process(self, block, async_process=True, block_hash: str = None) -> str:
+        data = block_to_dict(block)
+        params = {"json_block": "true", "block": data}
+        if async_process:
+            params["async"] = "true"
+        res = await self.call("process", params)
+        if "hash" in res:
+            return res["hash"]
+        # async processing only answers {"started": "1"}, the hash is known locally
+        return block_hash or local_block_hash(block, data)
+
+    # Submits blocks concurrently over `lanes` sequential lanes,
+    # all blocks of one account share a lane so their order is kept.
+    # Results are in input order, failed blocks get their exception as result unless `return_exceptions` is False.
+    # Precomputed `hashes` (in input order) save hashing blocks again when the node only acknowledges async processing.
+    async def process_blocks(
+        self, blocks, async_process=True, lanes=None, return_exceptions=True, hashes: list[str] = None
+    ) -> list:
+        lanes = lanes or self.concurrency
+        originals = list(blocks)
+        blocks = [block_to_dict(block) for block in originals]
+        indexed = [[] for _ in range(lanes)]
+        for index, block in enumerate(blocks):
+            indexed[account_shard(block_public_key(block), lanes)].append(index)
+
+        results = [None] * len(blocks)
+
+        async def process_lane(lane: list[int]):
+            for index in lane:
+                try:
+                    block_hash = hashes[index] if hashes else None
+                    if async_process and block_hash is None:
+                        block_hash = local_block_hash(originals[index], blocks[index])
+                    results[index] = await self.process(
+                        blocks[index], async_process=async_process, block_hash=block_hash
+                    )
+                except (RPCError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if not return_exceptions:
+                        raise
+                    results[index] = e
+
+        await asyncio.gather(*[process_lane(lane) for lane in indexed if lane])
+        return results
+
+
+@dataclass
+class ProcessResult:
+    name: str
+    results: list  # hash, or the exception of a failed block, in submission order
+    elapsed: float
+
+    @property
+    def hashes(self) -> list[str]:
+        return [res for res in self.results if not isinstance(res, Exception)]
+
+    @property
+    def errors(self) -> dict[int, Exception]:
+        return {index: res for index, res in enumerate(self.results) if isinstance(res, Exception)}
+
+    @property
+    def rate(self) -> float:
+        return len(self.results) / self.elapsed if self.elapsed > 0 else 0.0
+
+
+async def timed_process_blocks(client: AsyncNodeRPC, name: str, blocks, **kwargs) -> ProcessResult:
+    start = time.perf_counter()
+    results = await client.process_blocks(blocks, **kwargs)
+    return ProcessResult(name, results, time.perf_counter() - start)
+
+
+_loop_thread: EventLoopThread = None
+
+
+# Single background loop shared by all synchronous callers, so keep-alive connections survive between calls
+def rpc_loop() -> EventLoopThread:
+    global _loop_thread
+    if _loop_thread is None:
+        _loop_thread = EventLoopThread(name="rpc-loop")
+    return _loop_thread
+
+
+# Blocking facade for code outside of an event loop
+class NodeRPCPool:
+    def __init__(self, rpc_address, concurrency=env.RPC_CONCURRENCY, **kwargs):
+        self.client = AsyncNodeRPC(rpc_address, concurrency=concurrency, **kwargs)
+
+    def call(self, action: str, params: dict = None) -> dict:
+        return rpc_loop().run(self.client.call(action, params))
+
+    def blocks_info(self, hashes: list[str], chunk_size=1000) -> dict[str, dict]:
+        return rpc_loop().run(self.client.blocks_info(hashes, chunk_size=chunk_size))
+
+    def process(self, block, async_process=True) -> str:
+        return rpc_loop().run(self.client.process(block, async_process=async_process))
+
+    def process_blocks(self, blocks, async_process=True, **kwargs) -> list:
+        return rpc_loop().run(self.client.process_blocks(blocks, async_process=async_process, **kwargs))
+
+    def close(self):
+        rpc_loop().run(self.client.close())
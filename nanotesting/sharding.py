@@ -0,0 +1,66 @@
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Protocol
+
+from .wire import *
+
+
+# Decides which node a chain is injected at, must be stable per account so a chain's blocks stay in order
+class ShardingPolicy(Protocol):
+    def assign(self, public_key: bytes, count: int) -> int:
+        pass
+
+
+# Node choice uses other key bytes than `account_shard`, which picks the channel inside a node, otherwise every
+# account injected at one node would land on the same channel of it
+def node_hash(public_key: bytes) -> int:
+    return int.from_bytes(public_key[8:16], "little")
+
+
+class HashSharding:
+    def assign(self, public_key: bytes, count: int) -> int:
+        return node_hash(public_key) % count
+
+
+# Accounts are dealt to nodes in first seen order, assignments are kept across publishing rounds
+class RoundRobinSharding:
+    def __init__(self):
+        self.assignments: dict[bytes, int] = {}
+
+    def assign(self, public_key: bytes, count: int) -> int:
+        index = self.assignments.get(public_key)
+        if index is None or index >= count:
+            index = self.assignments[public_key] = len(self.assignments) % count
+        return index
+
+
+# Accounts hashed into node ranges proportional to weights, eg. node CPU limits
+class WeightedSharding:
+    def __init__(self, weights: list[float]):
+        assert weights and all(weight >= 0 for weight in weights) and sum(weights) > 0
+        total = sum(weights)
+        self.bounds = list(accumulate(weight / total for weight in weights))
+
+    def assign(self, public_key: bytes, count: int) -> int:
+        assert count == len(self.bounds), "Weights must match the node count"
+        point = node_hash(public_key) / 2**64
+        return min(bisect_right(self.bounds, point), count - 1)
+
+
+# Splits messages into one buffer per node, every message goes to its account's node and `replicas - 1` following nodes
+def shard_messages(
+    messages: PublishMessages, count: int, policy: ShardingPolicy = None, replicas=1
+) -> list[PublishMessages]:
+    policy = policy or HashSharding()
+    replicas = min(replicas, count)
+
+    parts = [[] for _ in range(count)]
+    buffer = messages.buffer
+    account = MESSAGE_HEADER_SIZE + ACCOUNT.start
+    for offset in range(0, len(buffer), PUBLISH_MESSAGE_SIZE):
+        message = buffer[offset : offset + PUBLISH_MESSAGE_SIZE]
+        index = policy.assign(bytes(buffer[offset + account : offset + account + 32]), count)
+        for replica in range(replicas):
+            parts[(index + replica) % count].append(message)
+
+    return [PublishMessages(b"".join(part)) for part in parts]
@@ -0,0 +1,220 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+from .common import title_bar
+from .rpc import AsyncNodeRPC, rpc_loop
+
+
+@dataclass
+class NodeStatus:
+    name: str
+    port: int
+    peers: int = 0
+    checked: int = 0
+    unchecked: int = 0
+    cemented: int = 0
+    aec_unconfirmed: int = 0
+    error: Exception = None
+
+    @property
+    def synchronized(self) -> bool:
+        return (
+            self.error is None and self.unchecked == 0 and self.checked == self.cemented and self.aec_unconfirmed == 0
+        )
+
+    def __str__(self):
+        if self.error is not None:
+            return f"[{self.name: <32} | port: {self.port: <5} | error: {self.error}]"
+        return (
+            f"[{self.name: <32} | port: {self.port: <5} | peers: {self.peers: >4} | checked: {self.checked: >9} | "
+            f"cemented: {self.cemented: >9} | unchecked: {self.unchecked: >9} | aec: {self.aec_unconfirmed: >5})]"
+        )
+
+
+# Status of all nodes sampled at (roughly) the same moment, convergence is always evaluated on a single snapshot
+@dataclass
+class NetStatus:
+    nodes: list[NodeStatus]
+    time: float
+
+    @property
+    def cemented_min(self) -> int:
+        return min(node.cemented for node in self.nodes)
+
+    @property
+    def cemented_max(self) -> int:
+        return max(node.cemented for node in self.nodes)
+
+    @property
+    def cemented_total(self) -> int:
+        return sum(node.cemented for node in self.nodes)
+
+    @property
+    def converged(self) -> bool:
+        return all(node.synchronized for node in self.nodes) and self.cemented_min == self.cemented_max
+
+    def summary(self) -> str:
+        unsynced = sum(not node.synchronized for node in self.nodes)
+        return (
+            f"cemented min: {self.cemented_min} max: {self.cemented_max} | "
+            f"unsynchronized nodes: {unsynced}/{len(self.nodes)}"
+        )
+
+    @title_bar(name="NODES")
+    def print(self):
+        for node in self.nodes:
+            print(node)
+
+
+# Blocks not (yet) confirmed per node name, nodes which confirmed everything are left out
+@dataclass
+class ConfirmationReport:
+    total: int
+    unconfirmed: dict[str, list[str]]
+    missing: dict[str, list[str]]  # not even present in the node ledger
+
+    @property
+    def confirmed(self) -> bool:
+        return not self.unconfirmed and not self.missing
+
+    def pending(self) -> list[str]:
+        hashes = {block_hash for node in self.unconfirmed.values() for block_hash in node}
+        hashes.update(block_hash for node in self.missing.values() for block_hash in node)
+        return sorted(hashes)
+
+    @title_bar(name="CONFIRMATION REPORT")
+    def print(self):
+        print("blocks:", self.total)
+        for name in sorted(set(self.unconfirmed) | set(self.missing)):
+            unconfirmed, missing = self.unconfirmed.get(name, []), self.missing.get(name, [])
+            print(f"{name: <32} | unconfirmed: {len(unconfirmed): >9} | missing: {len(missing): >9}")
+            for block_hash in (unconfirmed + missing)[:5]:
+                print("   ", block_hash, "missing" if block_hash in missing else "unconfirmed")
+
+
+async def node_unconfirmed(client: AsyncNodeRPC, hashes: list[str], chunk_size=1000) -> tuple[list[str], list[str]]:
+    responses = await client.call_chunked(
+        "blocks_info", "hashes", hashes, chunk_size, {"include_not_found": "true", "json_block": "true"}
+    )
+    unconfirmed, missing = [], []
+    for res in responses:
+        unconfirmed.extend(block_hash for block_hash, info in res["blocks"].items() if info.get("confirmed") != "true")
+        missing.extend(res.get("blocks_not_found") or [])
+    return unconfirmed, missing
+
+
+# Samples all nodes concurrently, once per tick. The tick interval resets while cementing progresses
+# and backs off exponentially (up to `max_interval`) while nothing changes.
+class StatusPoller:
+    def __init__(self, nodes: list["NanoNode"], interval=0.25, max_interval=5.0, backoff=1.5):
+        self.nodes = nodes
+        self.names = [node.name for node in nodes]
+        self.ports = [node.host_rpc_port for node in nodes]
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+
+    async def __node_status(self, index: int) -> NodeStatus:
+        client: AsyncNodeRPC = self.nodes[index].rpc_node.pool.client
+        status = NodeStatus(self.names[index], self.ports[index])
+        try:
+            block_count, peers, aec = await asyncio.gather(
+                client.call("block_count"), client.call("peers"), client.call("confirmation_active")
+            )
+        except Exception as e:
+            status.error = e
+            return status
+        status.checked = int(block_count["count"])
+        status.unchecked = int(block_count["unchecked"])
+        status.cemented = int(block_count["cemented"])
+        status.peers = len(peers["peers"] or {})
+        status.aec_unconfirmed = int(aec["unconfirmed"])
+        return status
+
+    async def snapshot(self) -> NetStatus:
+        nodes = await asyncio.gather(*[self.__node_status(index) for index in range(len(self.nodes))])
+        return NetStatus(list(nodes), time.monotonic())
+
+    async def __populate_backlog(self):
+        async def populate(index: int):
+            try:
+                await self.nodes[index].rpc_node.pool.client.call("populate_backlog")
+            except Exception:
+                print("Could not populate backlog:", self.names[index])
+
+        await asyncio.gather(*[populate(index) for index in range(len(self.nodes))])
+
+    async def wait_until_converged(self, timeout: float = None, populate_backlog=False) -> NetStatus:
+        start = time.monotonic()
+        interval = self.interval
+        prev: NetStatus = None
+        while True:
+            status = await self.snapshot()
+            if status.converged:
+                return status
+            print(f"waiting: {time.monotonic() - start: >7.2f} s | {status.summary()}")
+
+            if populate_backlog:
+                await self.__populate_backlog()
+
+            if prev is not None and status.cemented_total != prev.cemented_total:
+                interval = self.interval
+            else:
+                interval = min(interval * self.backoff, self.max_interval)
+            prev = status
+
+            if timeout is not None:
+                remaining = timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    status.print()
+                    raise TimeoutError(f"Nodes not converged after {timeout} s | {status.summary()}")
+                interval = min(interval, remaining)
+            await asyncio.sleep(interval)
+
+    # Checks the `confirmed` flag of every block on every node, chunked `blocks_info` calls on all nodes at once
+    async def verify_confirmed(self, hashes: list[str], chunk_size=1000) -> ConfirmationReport:
+        results = await asyncio.gather(
+            *[node_unconfirmed(node.rpc_node.pool.client, hashes, chunk_size) for node in self.nodes]
+        )
+        report = ConfirmationReport(len(hashes), {}, {})
+        for name, (unconfirmed, missing) in zip(self.names, results):
+            if unconfirmed:
+                report.unconfirmed[name] = unconfirmed
+            if missing:
+                report.missing[name] = missing
+        return report
+
+    # Waits for convergence, then re-verifies only the blocks still pending somewhere
+    # until all are confirmed everywhere
+    async def wait_until_confirmed(
+        self, hashes: list[str], timeout: float = None, populate_backlog=False
+    ) -> ConfirmationReport:
+        start = time.monotonic()
+        pending = list(dict.fromkeys(hashes))
+        while True:
+            remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - start))
+            await self.wait_until_converged(timeout=remaining, populate_backlog=populate_backlog)
+
+            report = await self.verify_confirmed(pending)
+            if report.confirmed:
+                return ConfirmationReport(len(hashes), {}, {})
+            print("unconfirmed blocks:", len(report.pending()), "of", len(hashes))
+
+            if timeout is not None and time.monotonic() - start >= timeout:
+                report.print()
+                raise TimeoutError(f"Blocks not confirmed after {timeout} s | pending: {len(report.pending())}")
+            pending = report.pending()
+            await asyncio.sleep(self.interval)
+
+    def snapshot_sync(self) -> NetStatus:
+        return rpc_loop().run(self.snapshot())
+
+    def wait(self, timeout: float = None, populate_backlog=False) -> NetStatus:
+        return rpc_loop().run(self.wait_until_converged(timeout=timeout, populate_backlog=populate_backlog))
+
+    def verify(self, hashes: list[str], chunk_size=1000) -> ConfirmationReport:
+        return rpc_loop().run(self.verify_confirmed(hashes, chunk_size=chunk_size))
+
+    def wait_confirmed(self, hashes: list[str], timeout: float = None, populate_backlog=False) -> ConfirmationReport:
+        return rpc_loop().run(self.wait_until_confirmed(hashes, timeout=timeout, populate_backlog=populate_backlog))
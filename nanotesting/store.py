@@ -0,0 +1,194 @@
+import struct
+import threading
+from array import array
+from contextlib import contextmanager
+from binascii import hexlify, unhexlify
+from functools import lru_cache
+from hashlib import blake2b
+
+import nanolib
+from ed25519_blake2b import SigningKey
+
+# Canonical state block serialization (as sent over the network):
+# account (32) | previous (32) | representative (32) | balance (16) | link (32) | signature (64) | work (8)
+STATE_BLOCK_SIZE = 216
+
+ACCOUNT = slice(0, 32)
+PREVIOUS = slice(32, 64)
+REPRESENTATIVE = slice(64, 96)
+BALANCE = slice(96, 112)
+LINK = slice(112, 144)
+SIGNATURE = slice(144, 208)
+WORK = slice(208, 216)
+
+# Store record: serialized block | block hash (32) | slot of previous block (int32, -1 if unknown) | padding
+HASH = slice(216, 248)
+PREV_SLOT = 248
+RECORD_SIZE = 256
+
+STATE_BLOCK_PREAMBLE = (6).to_bytes(32, "big")
+ZERO_HASH = bytes(32)
+
+
+@lru_cache(maxsize=65536)
+def to_public_key(account_id: str) -> bytes:
+    return unhexlify(nanolib.get_account_public_key(account_id=account_id))
+
+
+@lru_cache(maxsize=65536)
+def to_account_id(public_key: bytes) -> str:
+    return nanolib.get_account_id(public_key=hexlify(public_key).decode(), prefix="nano_")
+
+
+@lru_cache(maxsize=4096)
+def signing_key(private_key: str) -> SigningKey:
+    return SigningKey(unhexlify(private_key))
+
+
+def state_block_hash(account: bytes, previous: bytes, representative: bytes, balance: int, link: bytes) -> bytes:
+    h = blake2b(digest_size=32)
+    h.update(STATE_BLOCK_PREAMBLE)
+    h.update(account)
+    h.update(previous)
+    h.update(representative)
+    h.update(balance.to_bytes(16, "big"))
+    h.update(link)
+    return h.digest()
+
+
+def encode_state_block(
+    account: bytes,
+    previous: bytes,
+    representative: bytes,
+    balance: int,
+    link: bytes,
+    private_key: str,
+    work: bytes,
+) -> tuple[bytes, bytes]:
+    if balance < 0:
+        raise ValueError("Insufficient balance")
+
+    block_hash = state_block_hash(account, previous, representative, balance, link)
+    signature = signing_key(private_key).sign(block_hash)
+    data = b"".join([account, previous, representative, balance.to_bytes(16, "big"), link, signature, work])
+    return data, block_hash
+
+
+def encode_nlib_block(block_nlib: nanolib.Block) -> tuple[bytes, bytes]:
+    if block_nlib.block_type != "state":
+        raise ValueError(f"Only state blocks can be serialized: {block_nlib.block_type}")
+
+    data = b"".join(
+        [
+            to_public_key(block_nlib.account),
+            unhexlify(block_nlib.previous or nanolib.blocks.ZERO_BLOCK_HASH),
+            to_public_key(block_nlib.representative),
+            block_nlib.balance.to_bytes(16, "big"),
+            unhexlify(block_nlib.link),
+            unhexlify(block_nlib.signature) if block_nlib.signature else bytes(64),
+            unhexlify(block_nlib.work) if block_nlib.work else bytes(8),
+        ]
+    )
+    return data, unhexlify(block_nlib.block_hash)
+
+
+def decode_state_block(data: bytes) -> dict:
+    return {
+        "type": "state",
+        "account": to_account_id(bytes(data[ACCOUNT])),
+        "previous": hexlify(data[PREVIOUS]).decode().upper(),
+        "representative": to_account_id(bytes(data[REPRESENTATIVE])),
+        "balance": str(int.from_bytes(data[BALANCE], "big")),
+        "link": hexlify(data[LINK]).decode().upper(),
+        "link_as_account": to_account_id(bytes(data[LINK])),
+        "signature": hexlify(data[SIGNATURE]).decode().upper(),
+        "work": hexlify(data[WORK]).decode(),
+    }
+
+
+class BlockStore:
+    _instance = None
+
+    def __init__(self, capacity=1 << 16):
+        self.__data = bytearray(capacity * RECORD_SIZE)
+        self.__capacity = capacity
+        self.__count = 0
+        # account public key -> slots in insertion order (index is height within the store)
+        self.__accounts: dict[bytes, array] = {}
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "BlockStore":
+        if cls._instance is None:
+            cls._instance = BlockStore()
+        return cls._instance
+
+    # Scoped default store, eg. one per scenario. Blocks keep a reference to their store, so its memory is released
+    # once the scope ended and the blocks created in it are gone.
+    @classmethod
+    @contextmanager
+    def create(cls, capacity=1 << 16):
+        prev = cls._instance
+        cls._instance = BlockStore(capacity)
+        try:
+            yield cls._instance
+        finally:
+            cls._instance = prev
+
+    # Drops the default store, the next block starts a new one
+    @classmethod
+    def reset(cls):
+        cls._instance = None
+
+    def __len__(self):
+        return self.__count
+
+    @property
+    def nbytes(self):
+        return len(self.__data)
+
+    def append(self, data: bytes, block_hash: bytes, prev_slot=-1) -> int:
+        assert len(data) == STATE_BLOCK_SIZE and len(block_hash) == 32
+
+        with self.__lock:
+            if self.__count == self.__capacity:
+                self.__data.extend(bytes(self.__capacity * RECORD_SIZE))
+                self.__capacity *= 2
+
+            slot = self.__count
+            offset = slot * RECORD_SIZE
+            self.__data[offset : offset + STATE_BLOCK_SIZE] = data
+            self.__data[offset + HASH.start : offset + HASH.stop] = block_hash
+            struct.pack_into("<i", self.__data, offset + PREV_SLOT, prev_slot)
+            self.__count += 1
+
+            account = bytes(data[ACCOUNT])
+            slots = self.__accounts.get(account)
+            if slots is None:
+                slots = self.__accounts[account] = array("l")
+            slots.append(slot)
+
+        return slot
+
+    def field(self, slot: int, field: slice) -> bytes:
+        offset = slot * RECORD_SIZE
+        return bytes(self.__data[offset + field.start : offset + field.stop])
+
+    def data(self, slot: int) -> bytes:
+        return self.field(slot, slice(0, STATE_BLOCK_SIZE))
+
+    def block_hash(self, slot: int) -> bytes:
+        return self.field(slot, HASH)
+
+    def balance(self, slot: int) -> int:
+        offset = slot * RECORD_SIZE
+        return int.from_bytes(self.__data[offset + BALANCE.start : offset + BALANCE.stop], "big")
+
+    def prev_slot(self, slot: int) -> int:
+        return struct.unpack_from("<i", self.__data, slot * RECORD_SIZE + PREV_SLOT)[0]
+
+    def account_slots(self, account: bytes) -> array:
+        return self.__accounts.get(account, array("l"))
+
+    def slot_at(self, account: bytes, height: int) -> int:
+        return self.__accounts[account][height]
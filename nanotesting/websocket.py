@@ -0,0 +1,138 @@
+import asyncio
+import json
+import time
+
+import websockets
+
+from .common import EventLoopThread
+
+CONFIRMATION_SUBSCRIBE = {
+    "action": "subscribe",
+    "topic": "confirmation",
+    "ack": True,
+    # hashes are all we index, skip the block contents
+    "options": {"include_block": "false", "include_election_info": "false"},
+}
+
+
+# Confirmation topic subscriber of a single node, indexes hash -> local receive time (time.time())
+class ConfirmationSubscriber:
+    RECONNECT_DELAY = 0.5
+
+    def __init__(self, url: str, name: str = None):
+        self.url = url
+        self.name = name or url
+        self.confirmed: dict[str, float] = {}
+        self.__waiters: list[tuple[set, asyncio.Event]] = []
+        self.__task: asyncio.Task = None
+        self.__subscribed = asyncio.Event()
+
+    async def start(self, timeout=10):
+        self.__task = asyncio.create_task(self.__run())
+        try:
+            await asyncio.wait_for(self.__subscribed.wait(), timeout)
+        except asyncio.TimeoutError:
+            await self.stop()
+            raise TimeoutError(f"{self.name}: confirmation subscription not acknowledged")
+
+    async def stop(self):
+        if self.__task:
+            self.__task.cancel()
+            await asyncio.gather(self.__task, return_exceptions=True)
+            self.__task = None
+
+    # Reconnects with backoff however the connection ended, a node closing cleanly (eg. on restart) included
+    async def __run(self):
+        delay = self.RECONNECT_DELAY
+        while True:
+            try:
+                async with websockets.connect(self.url, max_size=None) as ws:
+                    await ws.send(json.dumps(CONFIRMATION_SUBSCRIBE))
+                    async for message in ws:
+                        self.__on_message(json.loads(message))
+                        delay = self.RECONNECT_DELAY
+                print("websocket closed:", self.name)
+            except asyncio.CancelledError:
+                raise
+            except (OSError, websockets.WebSocketException) as e:
+                print("websocket error:", self.name, e)
+            except Exception as e:
+                # eg. a malformed message, the subscription starts over on a new connection
+                print("websocket unexpected error:", self.name, repr(e))
+            # confirmations during the gap are missed, `wait_for` callers fall back to their timeout
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10)
+
+    def __on_message(self, data: dict):
+        if data.get("ack") == "subscribe":
+            self.__subscribed.set()
+            return
+        if data.get("topic") != "confirmation":
+            return
+
+        block_hash = data["message"]["hash"].upper()
+        if block_hash in self.confirmed:
+            return
+        self.confirmed[block_hash] = time.time()
+
+        for pending, event in self.__waiters:
+            pending.discard(block_hash)
+            if not pending:
+                event.set()
+
+    def pending(self, hashes) -> set[str]:
+        return {block_hash for block_hash in hashes if block_hash not in self.confirmed}
+
+    # Returns once every hash was confirmed, waiting is a set difference updated on each event instead of polling
+    async def wait_for(self, hashes, timeout: float = None):
+        pending = self.pending(block_hash.upper() for block_hash in hashes)
+        if not pending:
+            return
+        event = asyncio.Event()
+        waiter = (pending, event)
+        self.__waiters.append(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{self.name}: {len(pending)} blocks not confirmed after {timeout} s")
+        finally:
+            self.__waiters.remove(waiter)
+
+
+# Websocket subscribers for all nodes, running on their own background loop
+class ConfirmationTracker:
+    def __init__(self, urls: dict[str, str]):
+        self.loop_thread = EventLoopThread(name="websocket-loop")
+        self.subscribers = [ConfirmationSubscriber(url, name) for name, url in urls.items()]
+        self.loop_thread.run(self.__start_all())
+
+    async def __start_all(self):
+        await asyncio.gather(*[subscriber.start() for subscriber in self.subscribers])
+
+    async def __stop_all(self):
+        await asyncio.gather(*[subscriber.stop() for subscriber in self.subscribers])
+
+    def close(self):
+        try:
+            self.loop_thread.run(self.__stop_all())
+        finally:
+            self.loop_thread.stop()
+
+    async def async_wait_confirmed(self, hashes, timeout: float = None):
+        hashes = list(hashes)
+        await asyncio.gather(*[subscriber.wait_for(hashes, timeout) for subscriber in self.subscribers])
+
+    def wait_confirmed(self, hashes, timeout: float = None):
+        hashes = list(hashes)
+        start = time.monotonic()
+        self.loop_thread.run(self.async_wait_confirmed(hashes, timeout))
+        print(f"confirmed on all nodes: {len(hashes)} | {time.monotonic() - start:.2f} s")
+
+    # Confirmation time of a block per node name, None where it was not (yet) confirmed
+    def confirmation_times(self, block_hash: str) -> dict[str, float]:
+        block_hash = block_hash.upper()
+        return {subscriber.name: subscriber.confirmed.get(block_hash) for subscriber in self.subscribers}
+
+    def pending(self, hashes) -> dict[str, set[str]]:
+        hashes = [block_hash.upper() for block_hash in hashes]
+        return {subscriber.name: subscriber.pending(hashes) for subscriber in self.subscribers}
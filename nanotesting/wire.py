@@ -0,0 +1,175 @@
+import json
+from binascii import hexlify
+from functools import lru_cache
+from typing import Iterator
+
+import nanolib
+
+from . import env
+from .store import *
+
+# Packed block: canonical serialized state block (216) | block hash (32)
+PACKED_BLOCK_SIZE = STATE_BLOCK_SIZE + 32
+
+
+def pack_block(block) -> bytes:
+    if hasattr(block, "data") and hasattr(block, "hash_bytes"):
+        return block.data + block.hash_bytes
+    if isinstance(block, dict):
+        block_nlib = nanolib.Block.from_dict(block, verify=False)
+    else:
+        block_nlib = block.block_nlib
+    data, block_hash = encode_nlib_block(block_nlib)
+    return data + block_hash
+
+
+def block_public_key(block) -> bytes:
+    if isinstance(block, dict):
+        return to_public_key(block["account"])
+    if hasattr(block, "public_key"):
+        return block.public_key
+    return to_public_key(block.account)
+
+
+# Stable shard of an account, used to keep all blocks of one chain on the same channel / node
+def account_shard(public_key: bytes, count: int) -> int:
+    return int.from_bytes(public_key[:8], "little") % count
+
+
+class RawBlock:
+    __slots__ = ("data", "hash_bytes")
+
+    def __init__(self, data: bytes, hash_bytes: bytes):
+        self.data = data
+        self.hash_bytes = hash_bytes
+
+    @property
+    def block_hash(self) -> str:
+        return hexlify(self.hash_bytes).decode().upper()
+
+    @property
+    def public_key(self) -> bytes:
+        return bytes(self.data[ACCOUNT])
+
+    @property
+    def account(self) -> str:
+        return to_account_id(self.public_key)
+
+    @property
+    def balance(self) -> int:
+        return int.from_bytes(self.data[BALANCE], "big")
+
+    def json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def to_dict(self) -> dict:
+        return decode_state_block(self.data)
+
+
+# Read-only sequence of RawBlocks over one contiguous buffer of packed blocks
+class PackedBlocks:
+    def __init__(self, buffer: bytes = b""):
+        assert len(buffer) % PACKED_BLOCK_SIZE == 0
+        self.buffer = buffer
+
+    def __len__(self):
+        return len(self.buffer) // PACKED_BLOCK_SIZE
+
+    def __getitem__(self, index: int) -> RawBlock:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("block index out of range")
+        offset = index * PACKED_BLOCK_SIZE
+        return RawBlock(
+            self.buffer[offset : offset + STATE_BLOCK_SIZE],
+            self.buffer[offset + STATE_BLOCK_SIZE : offset + PACKED_BLOCK_SIZE],
+        )
+
+    def __iter__(self) -> Iterator[RawBlock]:
+        for offset in range(0, len(self.buffer), PACKED_BLOCK_SIZE):
+            yield RawBlock(
+                self.buffer[offset : offset + STATE_BLOCK_SIZE],
+                self.buffer[offset + STATE_BLOCK_SIZE : offset + PACKED_BLOCK_SIZE],
+            )
+
+
+# Message header: magic 'R' | network id | version max | version using | version min | message type |
+# extensions (u16 LE)
+NETWORK_IDS = {"dev": b"RA", "beta": b"RB", "live": b"RC", "test": b"RX"}
+MESSAGE_HEADER_SIZE = 8
+MESSAGE_TYPE_PUBLISH = 0x03
+BLOCK_TYPE_STATE = 0x06
+PUBLISH_MESSAGE_SIZE = MESSAGE_HEADER_SIZE + STATE_BLOCK_SIZE
+
+
+def message_header(message_type: int, extensions: int, network_type="test") -> bytes:
+    return b"".join(
+        [
+            NETWORK_IDS[network_type],
+            bytes([env.PROTOCOL_VERSION, env.PROTOCOL_VERSION, env.PROTOCOL_VERSION_MIN, message_type]),
+            extensions.to_bytes(2, "little"),
+        ]
+    )
+
+
+@lru_cache(maxsize=None)
+def publish_header(network_type="test") -> bytes:
+    # block type is stored in bits 8-11 of the extensions
+    return message_header(MESSAGE_TYPE_PUBLISH, BLOCK_TYPE_STATE << 8, network_type)
+
+
+def encode_publish(block, network_type="test") -> bytes:
+    if isinstance(block, RawBlock):
+        data = block.data
+    else:
+        data = pack_block(block)[:STATE_BLOCK_SIZE]
+    return publish_header(network_type) + data
+
+
+# Immutable contiguous buffer of fixed size publish messages, encoded once and written as is to any number of channels
+class PublishMessages:
+    def __init__(self, buffer: bytes):
+        assert len(buffer) % PUBLISH_MESSAGE_SIZE == 0
+        self.buffer = buffer
+        self.__partitions = {}
+
+    def __len__(self):
+        return len(self.buffer) // PUBLISH_MESSAGE_SIZE
+
+    # Splits messages by account shard, preserving order within each account
+    def partition(self, count: int) -> list["PublishMessages"]:
+        if count == 1:
+            return [self]
+        if count not in self.__partitions:
+            parts = [[] for _ in range(count)]
+            buffer = self.buffer
+            account = MESSAGE_HEADER_SIZE + ACCOUNT.start
+            for offset in range(0, len(buffer), PUBLISH_MESSAGE_SIZE):
+                shard = account_shard(buffer[offset + account : offset + account + 8], count)
+                parts[shard].append(buffer[offset : offset + PUBLISH_MESSAGE_SIZE])
+            self.__partitions[count] = [PublishMessages(b"".join(part)) for part in parts]
+        return self.__partitions[count]
+
+    # Zero copy views of consecutive whole messages, at most `size` bytes each
+    def chunks(self, size: int) -> Iterator[memoryview]:
+        size = max(PUBLISH_MESSAGE_SIZE, size - size % PUBLISH_MESSAGE_SIZE)
+        view = memoryview(self.buffer)
+        for offset in range(0, len(self.buffer), size):
+            yield view[offset : offset + size]
+
+
+def encode_publish_all(blocks, network_type="test") -> PublishMessages:
+    if isinstance(blocks, PublishMessages):
+        return blocks
+
+    header = publish_header(network_type)
+    if isinstance(blocks, PackedBlocks):
+        buffer = blocks.buffer
+        parts = []
+        for offset in range(0, len(buffer), PACKED_BLOCK_SIZE):
+            parts.append(header)
+            parts.append(buffer[offset : offset + STATE_BLOCK_SIZE])
+        return PublishMessages(b"".join(parts))
+
+    return PublishMessages(b"".join(encode_publish(block, network_type) for block in blocks))
@@ -0,0 +1,190 @@
+import atexit
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import nanolib
+
+from . import env
+
+ZERO_WORK = "0000000000000000"
+
+
+def is_zero_difficulty(difficulty: str) -> bool:
+    return int(difficulty, 16) == 0
+
+
+def _solve_work(root: str, difficulty: str) -> str:
+    return nanolib.solve_work(block_hash=root, difficulty=difficulty)
+
+
+# Solved work persisted on disk by (root, difficulty), shared between processes
+class WorkCache:
+    def __init__(self, path=env.WORK_CACHE_PATH):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__conn = None
+        self.__pid = None
+
+    def __connection(self) -> sqlite3.Connection:
+        # connections must not be shared with forked processes
+        if self.__conn is None or self.__pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.__conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+            self.__conn.execute(
+                "CREATE TABLE IF NOT EXISTS work"
+                " (root TEXT, difficulty TEXT, work TEXT, PRIMARY KEY (root, difficulty))"
+            )
+            self.__pid = os.getpid()
+        return self.__conn
+
+    def get_many(self, roots: list[str], difficulty: str) -> dict[str, str]:
+        result = {}
+        with self.__lock:
+            conn = self.__connection()
+            for i in range(0, len(roots), 500):
+                chunk = roots[i : i + 500]
+                rows = conn.execute(
+                    f"SELECT root, work FROM work WHERE difficulty = ? AND root IN ({','.join('?' * len(chunk))})",
+                    [difficulty, *chunk],
+                )
+                result.update(rows)
+        return result
+
+    def get(self, root: str, difficulty: str) -> str:
+        return self.get_many([root], difficulty).get(root)
+
+    def put_many(self, works: dict[str, str], difficulty: str):
+        if not works:
+            return
+        with self.__lock:
+            conn = self.__connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO work (root, difficulty, work) VALUES (?, ?, ?)",
+                    [(root, difficulty, work) for root, work in works.items()],
+                )
+
+    def put(self, root: str, difficulty: str, work: str):
+        self.put_many({root: work}, difficulty)
+
+
+# Solves proof of work for block roots on a process pool, with solved work cached on disk.
+# With zero difficulty (the default) no work is solved and no pool or cache is ever created.
+class WorkEngine:
+    _instance = None
+    _pid = None
+
+    def __init__(self, difficulty=env.DIFFICULTY, processes=env.WORK_PROCESSES, cache: WorkCache = None):
+        self.difficulty = difficulty
+        # pool workers (eg. bulk generator processes) are daemonic and cannot have children, solve inline there
+        if multiprocessing.current_process().daemon:
+            processes = 1
+        self.processes = processes or os.cpu_count()
+        self.cache = cache or WorkCache()
+        self.__pool: ProcessPoolExecutor = None
+        self.__pending: dict[str, Future] = {}
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "WorkEngine":
+        # forked processes inherit the parent's executor and pending futures, which never complete there
+        if cls._instance is None or cls._pid != os.getpid():
+            cls._instance = WorkEngine()
+            cls._pid = os.getpid()
+        return cls._instance
+
+    # Shuts down the pool of the default engine, if this process created one
+    @classmethod
+    def close_default(cls):
+        if cls._instance is not None and cls._pid == os.getpid():
+            cls._instance.close()
+
+    @property
+    def enabled(self) -> bool:
+        return not is_zero_difficulty(self.difficulty)
+
+    def __executor(self) -> ProcessPoolExecutor:
+        if self.__pool is None:
+            self.__pool = ProcessPoolExecutor(self.processes)
+            atexit.register(self.close)
+        return self.__pool
+
+    def close(self):
+        if self.__pool:
+            self.__pool.shutdown(cancel_futures=True)
+            self.__pool = None
+            atexit.unregister(self.close)
+        with self.__lock:
+            self.__pending.clear()
+
+    # Starts solving in the background, eg. the root of the next block as soon as the frontier is known
+    def prefetch(self, roots: list[str]):
+        if not self.enabled or self.processes == 1:
+            return
+
+        with self.__lock:
+            roots = [root for root in roots if root not in self.__pending]
+        cached = self.cache.get_many(roots, self.difficulty)
+
+        submitted = {}
+        with self.__lock:
+            for root in roots:
+                if root in cached or root in self.__pending:
+                    continue
+                submitted[root] = self.__pending[root] = self.__executor().submit(_solve_work, root, self.difficulty)
+        # outside the lock, the callback runs right away for futures which are already done
+        for root, future in submitted.items():
+            future.add_done_callback(lambda f, root=root: self.__solved(root, f))
+
+    def __solved(self, root: str, future: Future):
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(root, self.difficulty, future.result())
+        # solved roots are served from the cache, only unsolved ones stay pending
+        with self.__lock:
+            if self.__pending.get(root) is future:
+                del self.__pending[root]
+
+    def solve(self, root: str) -> str:
+        if not self.enabled:
+            return ZERO_WORK
+
+        with self.__lock:
+            future = self.__pending.pop(root, None)
+        if future:
+            return future.result()
+
+        work = self.cache.get(root, self.difficulty)
+        if work:
+            return work
+
+        if self.processes == 1:
+            work = _solve_work(root, self.difficulty)
+        else:
+            work = self.__executor().submit(_solve_work, root, self.difficulty).result()
+        self.cache.put(root, self.difficulty, work)
+        return work
+
+    def solve_all(self, roots: list[str]) -> list[str]:
+        if not self.enabled:
+            return [ZERO_WORK] * len(roots)
+
+        works = self.cache.get_many(list(set(roots)), self.difficulty)
+        missing = [root for root in dict.fromkeys(roots) if root not in works]
+        print("solving work:", len(missing), "cached:", len(roots) - len(missing), "processes:", self.processes)
+
+        if missing:
+            if self.processes == 1:
+                solved = [_solve_work(root, self.difficulty) for root in missing]
+            else:
+                chunksize = max(1, len(missing) // (self.processes * 4))
+                solved = list(
+                    self.__executor().map(_solve_work, missing, [self.difficulty] * len(missing), chunksize=chunksize)
+                )
+            solved = dict(zip(missing, solved))
+            self.cache.put_many(solved, self.difficulty)
+            works.update(solved)
+
+        return [works[root] for root in roots]
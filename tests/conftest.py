@@ -0,0 +1,37 @@
+import os
+import sys
+import types
+
+import nanolib
+import pytest
+
+# Tests import submodules without running nanotesting/__init__.py, which connects to docker and installs
+# a SIGINT handler at import time
+if "nanotesting" not in sys.modules:
+    package = types.ModuleType("nanotesting")
+    package.__path__ = [os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "nanotesting")]
+    sys.modules["nanotesting"] = package
+
+
+# Opened chain with a deterministic account, its frontier is a signed state block with zero work
+@pytest.fixture
+def make_chain():
+    from nanotesting.chain import Block, Chain
+
+    def make(index: int, balance=10**30) -> Chain:
+        seed = f"{index + 1:064X}"
+        account_id = nanolib.generate_account_id(seed, 0)
+        private_key = nanolib.generate_account_private_key(seed, 0)
+        block = nanolib.Block(
+            block_type="state",
+            account=account_id,
+            representative=account_id,
+            previous=None,
+            link="AB" * 32,
+            balance=balance,
+        )
+        block.sign(private_key)
+        block.set_work("0000000000000000")
+        return Chain(account_id, private_key, Block.from_nlib(block))
+
+    return make
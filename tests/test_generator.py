@@ -0,0 +1,33 @@
+from nanotesting.block_queue import BlockQueue
+from nanotesting.generator import generate_send_receive_pairs
+
+
+def serial_pairs(chain, count: int, amount: int) -> list[str]:
+    hashes = []
+    for _ in range(count):
+        send = chain.create_send(chain, amount)
+        chain.frontier = send
+        receive = chain.create_receive(send)
+        chain.frontier = receive
+        hashes += [send.block_hash, receive.block_hash]
+    return hashes
+
+
+def test_pooled_generator_matches_serial_chains(make_chain):
+    count, amount = 3, 7
+    pooled = [make_chain(index) for index in range(5)]
+    serial = [make_chain(index) for index in range(5)]
+
+    with BlockQueue.create() as block_queue:
+        assert generate_send_receive_pairs(pooled, count, amount=amount, processes=2) == 5 * count * 2
+
+    queued: dict[bytes, list[str]] = {}
+    for block in block_queue.get_all():
+        queued.setdefault(block.public_key, []).append(block.block_hash)
+
+    for pooled_chain, serial_chain in zip(pooled, serial):
+        expected = serial_pairs(serial_chain, count, amount)
+        assert queued[pooled_chain.public_key] == expected
+        assert pooled_chain.frontier.block_hash == serial_chain.frontier.block_hash == expected[-1]
+        assert pooled_chain.frontier.balance == serial_chain.frontier.balance
+        assert pooled_chain.frontier.previous == expected[-2]
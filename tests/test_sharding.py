@@ -0,0 +1,16 @@
+import os
+
+from nanotesting.sharding import HashSharding, WeightedSharding
+from nanotesting.wire import account_shard
+
+
+def test_node_and_channel_shards_are_independent():
+    keys = [os.urandom(32) for _ in range(4000)]
+    nodes, channels = 4, 4
+
+    for policy in [HashSharding(), WeightedSharding([1] * nodes)]:
+        per_node = [set() for _ in range(nodes)]
+        for key in keys:
+            per_node[policy.assign(key, nodes)].add(account_shard(key, channels))
+        # every node gets accounts for all of its channels
+        assert all(used == set(range(channels)) for used in per_node)
@@ -0,0 +1,97 @@
+from binascii import unhexlify
+
+import nanolib
+import pytest
+
+from nanotesting.chain import Block, Chain
+from nanotesting.store import BlockStore
+from nanotesting.wire import pack_block
+
+
+# The same block built and signed by nanolib
+def nlib_block(block: Block, private_key: str) -> nanolib.Block:
+    expected = nanolib.Block(
+        block_type="state",
+        account=block.account,
+        representative=block.representative,
+        previous=None if int(block.previous, 16) == 0 else block.previous,
+        link=block.to_dict()["link"],
+        balance=block.balance,
+    )
+    expected.sign(private_key)
+    expected.set_work(block.to_dict()["work"])
+    return expected
+
+
+# Canonical serialization written out field by field from nanolib values
+def nlib_packed(expected: nanolib.Block) -> bytes:
+    return b"".join(
+        [
+            unhexlify(nanolib.get_account_public_key(account_id=expected.account)),
+            unhexlify(expected.previous or "00" * 32),
+            unhexlify(nanolib.get_account_public_key(account_id=expected.representative)),
+            expected.balance.to_bytes(16, "big"),
+            unhexlify(expected.link),
+            unhexlify(expected.signature),
+            unhexlify(expected.work),
+            unhexlify(expected.block_hash),
+        ]
+    )
+
+
+@pytest.fixture
+def blocks(make_chain) -> list[tuple[str, Block, str]]:
+    source = make_chain(0)
+    destination = Chain(make_chain(1).account_id, make_chain(1).private_key)
+
+    send = source.create_send(destination, 10**20)
+    source.frontier = send
+    open_block = destination.create_receive(send)
+    destination.frontier = open_block
+    back = destination.create_send(source, 3)
+    receive = source.create_receive(back)
+    return [
+        ("send", send, source.private_key),
+        ("open", open_block, destination.private_key),
+        ("receive", receive, source.private_key),
+    ]
+
+
+def test_blocks_match_nanolib(blocks):
+    for kind, block, private_key in blocks:
+        expected = nlib_block(block, private_key)
+        assert block.block_hash == expected.block_hash, kind
+        assert block.to_dict()["signature"] == expected.signature, kind
+        assert pack_block(block) == nlib_packed(expected), kind
+        assert pack_block(expected.to_dict()) == pack_block(block), kind
+        # a node parses the json form, which must verify as well
+        nanolib.Block.from_dict(block.to_dict(), verify=False).verify_signature()
+
+
+def test_send_amounts(blocks):
+    (_, send, _), (_, open_block, _), (_, receive, _) = blocks
+    assert send.send_amount == 10**20
+    assert open_block.balance == 10**20
+    assert receive.balance == send.balance + 3
+
+
+def test_scoped_store(make_chain):
+    outer = BlockStore.default()
+    chain = make_chain(0)
+    with BlockStore.create() as store:
+        assert BlockStore.default() is store and store is not outer
+        send = chain.create_send(chain, 1)
+        assert send.store is store
+    assert BlockStore.default() is outer
+    # blocks created in the scope stay readable after it ended
+    assert send.send_amount == 1
+
+
+def test_fork_frontier_copied_once(make_chain):
+    chain = make_chain(0)
+    with BlockStore.create() as store:
+        forks = [chain.create_send(chain, amount) for amount in [1, 2, 3]]
+        # the outer frontier and the three forks
+        assert len(store) == 4
+        assert len({fork.prev_block.slot for fork in forks}) == 1
+        assert [fork.send_amount for fork in forks] == [1, 2, 3]
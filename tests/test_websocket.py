@@ -0,0 +1,127 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+import websockets
+
+from nanotesting.websocket import CONFIRMATION_SUBSCRIBE, ConfirmationSubscriber
+
+
+# Stand-in node websocket, connection i acks the subscription (unless `ack` is False), sends confirmations
+# of `scripts[i]["hashes"]` and then closes when `close` is set ("error" fails the handler, the client sees an abnormal
+# close, "malformed" sends a confirmation without message for the client to drop the connection on), or keeps sending
+# hashes put into `feed`.
+@asynccontextmanager
+async def stub_node(*scripts):
+    connections = []
+    feed = asyncio.Queue()
+
+    async def handler(ws, *args):
+        script = scripts[min(len(connections), len(scripts) - 1)]
+        connections.append(json.loads(await ws.recv()))
+        if script.get("ack", True):
+            await ws.send(json.dumps({"ack": "subscribe", "time": "0"}))
+        for block_hash in script.get("hashes", []):
+            await ws.send(json.dumps({"topic": "confirmation", "time": "0", "message": {"hash": block_hash}}))
+        if script.get("close") == "error":
+            raise RuntimeError("stub node failure")
+        if script.get("close") == "malformed":
+            await ws.send(json.dumps({"topic": "confirmation", "time": "0"}))
+        elif script.get("close"):
+            return
+        # the server only shuts down once every handler returned
+        closed = asyncio.ensure_future(ws.wait_closed())
+        while True:
+            block_hash = asyncio.ensure_future(feed.get())
+            await asyncio.wait([block_hash, closed], return_when=asyncio.FIRST_COMPLETED)
+            if closed.done():
+                block_hash.cancel()
+                return
+            await ws.send(json.dumps({"topic": "confirmation", "time": "0", "message": {"hash": block_hash.result()}}))
+
+    async with websockets.serve(handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        yield f"ws://127.0.0.1:{port}", connections, feed
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+
+def test_subscribe_and_wait_for():
+    async def main():
+        async with stub_node({"hashes": ["aa", "bb", "aa"]}) as (url, connections, feed):
+            subscriber = ConfirmationSubscriber(url, "node")
+            await subscriber.start()
+            await subscriber.wait_for(["AA", "bb"], timeout=5)
+            await subscriber.stop()
+
+        assert connections == [CONFIRMATION_SUBSCRIBE]
+        assert set(subscriber.confirmed) == {"AA", "BB"}
+        assert subscriber.pending(["AA", "CC"]) == {"CC"}
+
+    run(main())
+
+
+def test_waiters_share_confirmations():
+    async def main():
+        async with stub_node({}) as (url, connections, feed):
+            subscriber = ConfirmationSubscriber(url)
+            await subscriber.start()
+            first = asyncio.create_task(subscriber.wait_for(["AA", "BB"], timeout=5))
+            second = asyncio.create_task(subscriber.wait_for(["BB", "CC"], timeout=5))
+            await asyncio.sleep(0.1)
+
+            feed.put_nowait("bb")
+            feed.put_nowait("aa")
+            await first
+            assert not second.done()
+
+            feed.put_nowait("cc")
+            await second
+            await subscriber.stop()
+
+    run(main())
+
+
+def test_wait_for_timeout():
+    async def main():
+        async with stub_node({"hashes": ["AA"]}) as (url, connections, feed):
+            subscriber = ConfirmationSubscriber(url, "node")
+            await subscriber.start()
+            with pytest.raises(TimeoutError, match="node: 1 blocks not confirmed"):
+                await subscriber.wait_for(["AA", "BB"], timeout=0.2)
+            await subscriber.stop()
+
+    run(main())
+
+
+def test_start_without_ack():
+    async def main():
+        async with stub_node({"ack": False}) as (url, connections, feed):
+            subscriber = ConfirmationSubscriber(url, "node")
+            with pytest.raises(TimeoutError, match="not acknowledged"):
+                await subscriber.start(timeout=0.2)
+
+    run(main())
+
+
+@pytest.mark.parametrize("close", [True, "error", "malformed"])
+def test_reconnect_resubscribes(close):
+    async def main():
+        async with stub_node({"hashes": ["AA"], "close": close}, {"hashes": ["BB"]}) as (url, connections, feed):
+            subscriber = ConfirmationSubscriber(url, "node")
+            subscriber.RECONNECT_DELAY = 0.2
+            await subscriber.start()
+            await subscriber.wait_for(["AA"], timeout=5)
+            start = time.monotonic()
+            await subscriber.wait_for(["BB"], timeout=5)
+            # every reconnect backs off, clean closes included
+            assert time.monotonic() - start >= 0.15
+            await subscriber.stop()
+
+        assert connections == [CONFIRMATION_SUBSCRIBE, CONFIRMATION_SUBSCRIBE]
+
+    run(main())